@@ -0,0 +1,111 @@
+import os
+"""
+This module writes synthetic FAA MASTER and ACFTREF files for the benchmark scripts, with the same
+columns and fixed width, space padded fields as the real (prepped) FAA files, so the benchmarks can
+be run without downloading the FAA's data.
+"""
+
+# Column names and field widths of the prepped FAA files (hyphens replaced, BLANK column added)
+master_columns = [
+    ('N_NUMBER', 5), ('SERIAL_NUMBER', 30), ('MFR_MDL_CODE', 7), ('ENG_MFR_MDL', 5), ('YEAR_MFR', 4),
+    ('TYPE_REGISTRANT', 1), ('NAME', 50), ('STREET', 33), ('STREET2', 33), ('CITY', 18), ('STATE', 2),
+    ('ZIP_CODE', 10), ('REGION', 1), ('COUNTY', 3), ('COUNTRY', 2), ('LAST_ACTION_DATE', 8),
+    ('CERT_ISSUE_DATE', 8), ('CERTIFICATION', 10), ('TYPE_AIRCRAFT', 1), ('TYPE_ENGINE', 2),
+    ('STATUS_CODE', 2), ('MODE_S_CODE', 8), ('FRACT_OWNER', 1), ('AIR_WORTH_DATE', 8),
+    ('OTHER_NAMES_1', 50), ('OTHER_NAMES_2', 50), ('OTHER_NAMES_3', 50), ('OTHER_NAMES_4', 50),
+    ('OTHER_NAMES_5', 50), ('EXPIRATION_DATE', 8), ('UNIQUE_ID', 8), ('KIT_MFR', 30), ('KIT_MODEL', 20),
+    ('MODE_S_CODE_HEX', 10), ('BLANK', 0)
+]
+
+# ACFTREF rows written by write_files(), and the number of model codes MASTER rows refer to
+acftref_rows = 90000
+
+acftref_columns = [
+    ('CODE', 7), ('MFR', 30), ('MODEL', 20), ('TYPE_ACFT', 1), ('TYPE_ENG', 2), ('AC_CAT', 1),
+    ('BUILD_CERT_IND', 1), ('NO_ENG', 2), ('NO_SEATS', 3), ('AC_WEIGHT', 7), ('SPEED', 4), ('BLANK', 0)
+]
+
+
+def write_file(filename, columns, rows, make_values):
+    """
+    Writes a comma delimited file with space padded fields, one row at a time.
+
+    Parameters:
+        1 - file path to write
+        2 - list of (column name, field width) tuples
+        3 - number of rows to write
+        4 - function that takes the row number and returns a dictionary of values keyed by
+            column name (the other columns are filled with X's)
+    """
+
+    with open(filename, 'wb') as f:
+        f.write(','.join([name for name, width in columns]) + '\r\n')
+
+        for n in range(rows):
+            values = make_values(n)
+            f.write(','.join([values.get(name, 'X' * min(width, 4)).ljust(width) for name, width in columns]) + '\r\n')
+
+
+def master_values(n):
+    return {
+        'N_NUMBER': str(n + 1),
+        'MFR_MDL_CODE': '%07d' % (n % acftref_rows),
+        'YEAR_MFR': str(1960 + n % 60),
+        'TYPE_REGISTRANT': str(n % 8 + 1),
+        'NAME': 'REGISTRANT %d' % n,
+        'CITY': 'CITY %d' % (n % 1000),
+        'LAST_ACTION_DATE': '2016%02d%02d' % (n % 12 + 1, n % 28 + 1),
+        'CERT_ISSUE_DATE': '2010%02d%02d' % (n % 12 + 1, n % 28 + 1),
+        'TYPE_AIRCRAFT': str(n % 9 + 1),
+        'TYPE_ENGINE': str(n % 11),
+        'STATUS_CODE': 'V',
+        'MODE_S_CODE': '%08o' % (0xA00000 + n),
+        'AIR_WORTH_DATE': '2009%02d%02d' % (n % 12 + 1, n % 28 + 1),
+        'OTHER_NAMES_1': '',
+        'OTHER_NAMES_2': '',
+        'OTHER_NAMES_3': '',
+        'OTHER_NAMES_4': '',
+        'OTHER_NAMES_5': '',
+        'EXPIRATION_DATE': '2019%02d%02d' % (n % 12 + 1, n % 28 + 1),
+        'UNIQUE_ID': '%08d' % n,
+        'MODE_S_CODE_HEX': '%06X' % (0xA00000 + n),
+        'BLANK': ''
+    }
+
+
+def acftref_values(n):
+    return {
+        'CODE': '%07d' % n,
+        'MFR': 'MANUFACTURER %d' % (n % 500),
+        'MODEL': 'MODEL %d' % n,
+        'TYPE_ACFT': str(n % 9 + 1),
+        'TYPE_ENG': str(n % 11),
+        'AC_CAT': '1',
+        'BUILD_CERT_IND': str(n % 3),
+        'NO_ENG': '%02d' % (n % 4 + 1),
+        'NO_SEATS': '%03d' % (n % 400),
+        'AC_WEIGHT': 'CLASS %d' % (n % 4 + 1),
+        'SPEED': '%04d' % (n % 600),
+        'BLANK': ''
+    }
+
+
+def write_files(directory, master_rows):
+    """
+    Writes master.txt and acftref.txt files.
+
+    Parameters:
+        1 - directory to write the files to
+        2 - number of MASTER rows to write
+
+    Returns:
+        Tuple of the (MASTER, ACFTREF) file paths
+    """
+
+    master_file = os.path.join(directory, 'master.txt')
+    acftref_file = os.path.join(directory, 'acftref.txt')
+
+    write_file(master_file, master_columns, master_rows, master_values)
+    write_file(acftref_file, acftref_columns, acftref_rows, acftref_values)
+
+    return (master_file, acftref_file)
@@ -1,9 +1,62 @@
+import csv
+import itertools
+import multiprocessing
 import numpy
+import os
+import shutil
 import sqlite3
+import struct
+import tempfile
+import time
+import zipfile
 """
 This module contains functions for setting up a database (creating tables, inserting data, etc.).
 """
 
+# Pragmas set on the connection when loading in bulk mode.  The rollback journal is kept in memory, so
+# a failed load can still be rolled back, but with no syncing to disk a crash or power loss in the middle
+# of a load can corrupt the database, so bulk mode is for loading a database that can simply be loaded
+# again from the FAA files if that happens.  (journal_mode = OFF would be no faster for one big transaction
+# and makes ROLLBACK undefined.)
+BULK_LOAD_PRAGMAS = [
+    'PRAGMA journal_mode = MEMORY',
+    'PRAGMA synchronous = OFF',
+    'PRAGMA cache_size = -262144',  # 256 MB
+    'PRAGMA temp_store = MEMORY'
+]
+
+# FAA registry files loaded by load_faa_files(): table name, file name in the FAA's release, and the
+# column the table is indexed on
+FAA_FILES = [
+    ('faa_master', 'MASTER.txt', 'n_number'),
+    ('faa_acftref', 'ACFTREF.txt', 'code'),
+    ('faa_engine', 'ENGINE.txt', 'code'),
+    ('faa_dereg', 'DEREG.txt', 'n_number'),
+    ('faa_dealer', 'DEALER.txt', 'certificate_number')
+]
+
+# Files bigger than this many bytes are split between several workers by load_faa_files()
+PART_SIZE = 16 * 1048576
+
+# PRAGMA user_version of a database converted by convert_to_typed_schema()
+TYPED_SCHEMA_VERSION = 1
+
+# Columns stored as INTEGER by convert_to_typed_schema() (the other columns are TEXT, including the codes
+# with leading zeros like mfr_mdl_code)
+TYPED_COLUMNS = {
+    'faa_master': ['year_mfr', 'type_registrant', 'last_action_date', 'cert_issue_date', 'type_engine',
+                   'air_worth_date', 'expiration_date', 'unique_id'],
+    'faa_acftref': ['type_eng', 'ac_cat', 'build_cert_ind', 'no_eng', 'no_seats', 'speed'],
+    'faa_engine': ['type', 'horsepower', 'thrust'],
+    'faa_dereg': ['year_mfr', 'cancel_date', 'last_act_date', 'cert_issue_date', 'air_worth_date'],
+}
+
+# Tables stored as WITHOUT ROWID tables by convert_to_typed_schema(), and their primary key
+WITHOUT_ROWID_KEYS = {
+    'faa_acftref': 'code',
+    'faa_engine': 'code'
+}
+
 def create_table(database, table, headers):
     """
     This function creates a SQLite table.
@@ -88,7 +141,7 @@ def insert_data(database, table, data):
     con.close()
 
 
-def create_table_and_insert(database, table, data):
+def create_table_and_insert(database, table, data, bulk=False, indexes=None):
     """
     This function creates a table in a SQLite databse AND inserts data into that table.
     If the table already exists, it is dropped first.
@@ -98,6 +151,8 @@ def create_table_and_insert(database, table, data):
         2 - string name of the table the data is going into
         3 - the dataset, which must be an array of tuples (each record is a tuple), and the first tuple must
             include the field names of the table
+        4 - True to load in bulk mode (optional, see BULK_LOAD_PRAGMAS), which also runs ANALYZE on the table
+        5 - list of columns to index once the data is in (optional)
     """
 
     # Pop off the first row of the dataset and save it as the headers
@@ -132,6 +187,9 @@ def create_table_and_insert(database, table, data):
     con = sqlite3.connect(database)
     cursor = con.cursor()
     
+    if bulk:
+        set_bulk_load_pragmas(con)
+    
     # Drop table if it already exists so we can start fresh
     cursor.execute('''DROP TABLE IF EXISTS ''' + table)
     con.commit()
@@ -147,6 +205,14 @@ def create_table_and_insert(database, table, data):
     
     print 'inserted ' + str(len(data)) + ' records into ' + table + ' table\n'
     
+    # Indexes are built after the data is in, which is faster than updating them with every insert
+    create_indexes(con, table, indexes)
+    
+    if bulk:
+        con.execute('''ANALYZE ''' + table)
+    
+    con.commit()
+    
     con.close()
     
 
@@ -171,4 +237,1018 @@ def get_data_from_text_file(filename):
 
     return data
 
-    
\ No newline at end of file
+
+def read_text_file(filename):
+    """
+    This function reads a comma delimited .txt file one row at a time instead of loading the whole
+    file into memory like get_data_from_text_file() does.  The first row of the file should be
+    headers with column/field names.
+
+    Parameters:
+        1 - the string file path of the .txt file
+
+    Returns:
+        A generator that yields each row (headers first) as a list of strings
+    """
+
+    with open(filename, 'rb') as f:
+        for row in csv.reader(f):
+            yield row
+
+
+def load_rows(database, table, rows, chunk_size=10000, bulk=False, indexes=None):
+    """
+    This function creates a table in a SQLite database AND inserts rows into it like
+    create_table_and_insert(), but takes the rows from an iterator (like read_text_file())
+    and inserts them in chunks, so only one chunk is ever held in memory no matter how big the
+    file is.  All of the chunks are inserted in a single transaction, so the table is either
+    loaded completely or not changed.  If the table already exists, it is dropped first.
+
+    Parameters:
+        1 - string file path of database (if the database doesn't exist, it will be created)
+        2 - string name of the table the data is going into
+        3 - iterator of rows (lists or tuples), and the first row must be the field names of the table
+        4 - number of rows to insert at a time (optional)
+        5 - True to load in bulk mode (optional, see BULK_LOAD_PRAGMAS), which also runs ANALYZE on the table
+        6 - list of columns to index once the data is in (optional)
+
+    Returns:
+        The number of rows inserted
+    """
+
+    start = time.time()
+
+    rows = iter(rows)
+
+    headers = next(rows)
+
+    create_statement = ('''CREATE TABLE ''' + table + '''(''' + ','.join([header + ' TEXT' for header in headers]) + ''')''')
+
+    insert_statement = ('''INSERT INTO ''' + table + '''(''' + ','.join(headers) + ''') VALUES(''' + ','.join(['?'] * len(headers)) + ''')''')
+
+    # Connect to the specified database, the drop, create and inserts below are all one transaction
+    con = sqlite3.connect(database)
+    con.isolation_level = None
+
+    if bulk:
+        set_bulk_load_pragmas(con)
+
+    count = 0
+
+    try:
+        con.execute('''BEGIN''')
+        con.execute('''DROP TABLE IF EXISTS ''' + table)
+        con.execute(create_statement)
+
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+
+            if len(chunk) == 0:
+                break
+
+            con.executemany(insert_statement, chunk)
+            count += len(chunk)
+
+        # Indexes are built after the data is in, which is faster than updating them with every insert
+        create_indexes(con, table, indexes)
+
+        if bulk:
+            con.execute('''ANALYZE ''' + table)
+
+        con.execute('''COMMIT''')
+
+    except:
+        con.execute('''ROLLBACK''')
+        raise
+
+    finally:
+        con.close()
+
+    elapsed = time.time() - start
+
+    print 'inserted ' + str(count) + ' records into ' + table + ' table in ' + ('%.1f' % elapsed) + ' seconds (' + str(int(count / max(elapsed, 0.001))) + ' rows/sec)\n'
+
+    return count
+
+
+def load_text_file(database, table, filename, chunk_size=10000, bulk=False, indexes=None):
+    """
+    This function streams a comma delimited .txt file into a new SQLite table (see load_rows()).
+
+    Parameters:
+        1 - string file path of database (if the database doesn't exist, it will be created)
+        2 - string name of the table the data is going into
+        3 - the string file path of the .txt file
+        4 - number of rows to insert at a time (optional)
+        5 - True to load in bulk mode (optional, see BULK_LOAD_PRAGMAS)
+        6 - list of columns to index once the data is in (optional)
+
+    Returns:
+        The number of rows inserted
+    """
+
+    print 'loading ' + filename + ' into ' + table
+
+    return load_rows(database, table, read_text_file(filename), chunk_size, bulk, indexes)
+
+
+# UTF-8 byte order mark that the FAA files start with
+UTF8_BOM = '\xef\xbb\xbf'
+
+
+def prepare_faa_headers(headers):
+    """
+    This function preps the column headers of a raw FAA .txt file.  It removes the UTF-8 byte order mark,
+    replaces the hyphens and spaces with underscores, and names the empty column after the last comma BLANK.
+
+    Parameters:
+        1 - list of headers as strings
+
+    Returns:
+        List of the prepped headers
+    """
+
+    prepped_headers = []
+
+    for header in headers:
+        header = header.replace(UTF8_BOM, '').strip().replace('-', '_').replace(' ', '_')
+
+        if header == '':
+            header = 'BLANK'
+
+        prepped_headers.append(header)
+
+    return prepped_headers
+
+
+def prepare_faa_rows(rows, headers=True):
+    """
+    This function does the prep work the raw FAA .txt files need before they can be loaded, one row at a
+    time while they're being read, so no prepped copy of the file has to be saved.  The headers are prepped
+    with prepare_faa_headers(), and rows with non-ASCII characters are decoded from UTF-8, since SQLite only
+    takes ASCII bytestrings.  Hashtags don't need to be replaced, since only numpy.genfromtxt() treated them
+    as comments (the csv module doesn't).  Files that were already prepped by hand pass through unchanged.
+
+    Parameters:
+        1 - iterator of rows as lists of strings (like read_text_file())
+        2 - True if the first row is the headers (optional)
+
+    Returns:
+        A generator that yields the prepped rows, headers first
+    """
+
+    rows = iter(rows)
+
+    if headers:
+        yield prepare_faa_headers(next(rows))
+
+    for row in rows:
+        # Decoding the joined row as ASCII is a fast check for any non-ASCII byte
+        try:
+            ''.join(row).decode('ascii')
+        except UnicodeDecodeError:
+            row = [value.decode('utf-8', 'replace') for value in row]
+
+        yield row
+
+
+def open_faa_file(filename, member=None):
+    """
+    This function opens a raw FAA .txt file, or one of the .txt files in a directory or in the FAA's
+    ReleasableAircraft.zip without extracting it (it's decompressed as it's read).
+
+    Parameters:
+        1 - the string file path of the .txt file, or of the directory or .zip file the .txt file is in
+        2 - name of the .txt file in the directory or .zip file, like MASTER.txt (case doesn't matter)
+
+    Returns:
+        File object to read the lines of the .txt file from (the caller should close it)
+    """
+
+    if os.path.isdir(filename):
+        found = find_faa_file(filename, str(member))
+
+        if found is None:
+            raise ValueError(str(member) + ' is not in ' + filename)
+
+        filename = found[0][0]
+
+    if zipfile.is_zipfile(filename):
+        with zipfile.ZipFile(filename) as archive:
+            names = [name for name in archive.namelist() if name.lower() == str(member).lower()]
+
+            if len(names) == 0:
+                raise ValueError(str(member) + ' is not in ' + filename)
+
+            # The member keeps its own handle on the .zip file after the archive is closed
+            return archive.open(names[0])
+
+    return open(filename, 'rb')
+
+
+def read_faa_file(filename, member=None):
+    """
+    This function reads a raw FAA .txt file one row at a time and preps it with prepare_faa_rows().
+
+    Parameters:
+        1 - the string file path of the .txt file, or of the directory or .zip file the .txt file is in
+        2 - name of the .txt file in the directory or .zip file, like MASTER.txt (case doesn't matter)
+
+    Returns:
+        A generator that yields each prepped row (headers first) as a list of strings
+    """
+
+    f = open_faa_file(filename, member)
+
+    try:
+        for row in prepare_faa_rows(csv.reader(f)):
+            yield row
+    finally:
+        f.close()
+
+
+def find_faa_file(source, member):
+    """
+    This function finds one of the FAA's .txt files in a directory or .zip file.
+
+    Parameters:
+        1 - string path of the directory or .zip file the FAA files are in
+        2 - name of the .txt file, like MASTER.txt (case doesn't matter)
+
+    Returns:
+        Tuple of the (file path, member name) to pass to open_faa_file() and the file's uncompressed
+        size in bytes, or None if it isn't there
+    """
+
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in archive.infolist():
+                if info.filename.lower() == member.lower():
+                    return ((source, info.filename), info.file_size)
+
+    elif os.path.isdir(source):
+        for name in os.listdir(source):
+            if name.lower() == member.lower():
+                filename = os.path.join(source, name)
+                return ((filename, None), os.path.getsize(filename))
+
+    return None
+
+
+def load_faa_part(task):
+    """
+    This function is run by the worker processes of load_faa_files().  It parses part of an FAA file
+    and saves the rows to a new batch database, which the writer then copies into the main database.
+    A file is split into parts by chunks of lines, and the part's chunks are the ones where the chunk
+    number divided by the number of parts leaves the part number.  Each worker reads every line, but only
+    parses its own chunks, which is where the time goes.  The FAA files don't have quoted fields with line
+    breaks in them, so a line is always a row.  Each row's rowid is its line number in the file, so the
+    rows end up in the same order as the file no matter which worker parsed them.
+
+    Parameters:
+        1 - tuple of (file path, member name, table name, part number, number of parts,
+            batch database file path, number of lines per chunk)
+
+    Returns:
+        Tuple of (table name, batch database file path, number of rows)
+    """
+
+    filename, member, table, part, parts, batch_database, chunk_size = task
+
+    f = open_faa_file(filename, member)
+
+    try:
+        headers = prepare_faa_headers(next(csv.reader([f.readline()])))
+
+        con = sqlite3.connect(batch_database)
+        set_bulk_load_pragmas(con)
+
+        con.execute('''CREATE TABLE ''' + table + '''(''' + ','.join([header + ' TEXT' for header in headers]) + ''')''')
+
+        insert_statement = ('''INSERT INTO ''' + table + '''(rowid,''' + ','.join(headers) + ''') VALUES(''' + ','.join(['?'] * (len(headers) + 1)) + ''')''')
+
+        chunk_number = 0
+        count = 0
+
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+
+            if len(lines) == 0:
+                break
+
+            if chunk_number % parts == part:
+                first_rowid = chunk_number * chunk_size + 1
+
+                rows = [[first_rowid + n] + row for n, row in enumerate(prepare_faa_rows(csv.reader(lines), headers=False)) if row]
+
+                con.executemany(insert_statement, rows)
+                count += len(rows)
+
+            chunk_number += 1
+
+        con.commit()
+        con.close()
+
+    finally:
+        f.close()
+
+    return (table, batch_database, count)
+
+
+def load_faa_files(database, source, files=None, workers=None, chunk_size=10000):
+    """
+    This function loads the FAA's registry files into new tables, parsing them in parallel worker
+    processes while one writer connection copies the parsed rows into the database.  Files bigger
+    than PART_SIZE are split between several workers (see load_faa_part()), so loading the MASTER
+    file isn't held up by one CPU doing all of the parsing.  The tables are loaded in bulk mode and
+    each is indexed on its key column (see FAA_FILES) once it's loaded.  Files that aren't in the
+    source are skipped.  If a table already exists, it is dropped first.
+
+    Parameters:
+        1 - string file path of database (if the database doesn't exist, it will be created)
+        2 - string path of the directory or ReleasableAircraft.zip file the FAA files are in
+        3 - list of (table name, file name, key column) tuples (optional, defaults to FAA_FILES)
+        4 - number of worker processes (optional, defaults to the number of CPUs)
+        5 - number of lines in each chunk a worker parses (optional)
+
+    Returns:
+        Dictionary of the number of rows loaded keyed by table name
+    """
+
+    start = time.time()
+
+    if files is None:
+        files = FAA_FILES
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    batch_directory = tempfile.mkdtemp()
+
+    tasks = []
+    key_columns = {}
+    parts_left = {}
+
+    for table, member, key_column in files:
+        found = find_faa_file(source, member)
+
+        if found is None:
+            print member + ' is not in ' + source + ', skipping the ' + table + ' table'
+            continue
+
+        (filename, member), size = found
+
+        parts = max(1, min(workers, int(size // PART_SIZE)))
+
+        for part in range(parts):
+            batch_database = os.path.join(batch_directory, table + '_' + str(part) + '.db')
+            tasks.append((filename, member, table, part, parts, batch_database, chunk_size))
+
+        key_columns[table] = key_column
+        parts_left[table] = parts
+
+    # The biggest files are started first so they don't finish last on their own
+    tasks.sort(key=lambda task: -task[4])
+
+    pool = multiprocessing.Pool(workers)
+
+    con = sqlite3.connect(database)
+    con.isolation_level = None
+    set_bulk_load_pragmas(con)
+
+    counts = {}
+
+    try:
+        # Copy each batch into the database as soon as a worker finishes it
+        for table, batch_database, count in pool.imap_unordered(load_faa_part, tasks):
+
+            # SQLite can't attach a database inside a transaction, so each batch is its own transaction
+            con.execute('''ATTACH DATABASE ? AS batch''', (batch_database,))
+            con.execute('''BEGIN''')
+
+            columns = ','.join([row[1] for row in con.execute('''PRAGMA batch.table_info(''' + table + ''')''')])
+
+            if table not in counts:
+                con.execute('''DROP TABLE IF EXISTS main.''' + table)
+                con.execute('''CREATE TABLE main.''' + table + ''' AS SELECT * FROM batch.''' + table + ''' WHERE 0''')
+                counts[table] = 0
+
+            con.execute('''INSERT INTO main.''' + table + '''(rowid,''' + columns + ''') SELECT rowid,''' + columns + ''' FROM batch.''' + table)
+
+            parts_left[table] -= 1
+
+            # Index the table once its last batch is in
+            if parts_left[table] == 0:
+                if key_columns[table].lower() in columns.lower().split(','):
+                    create_indexes(con, table, [key_columns[table]])
+
+                con.execute('''ANALYZE main.''' + table)
+
+            con.execute('''COMMIT''')
+            con.execute('''DETACH DATABASE batch''')
+
+            os.remove(batch_database)
+
+            counts[table] += count
+
+        pool.close()
+
+    except:
+        pool.terminate()
+        raise
+
+    finally:
+        pool.join()
+        con.close()
+        shutil.rmtree(batch_directory, ignore_errors=True)
+
+    elapsed = time.time() - start
+    total = sum(counts.values())
+
+    for table in sorted(counts):
+        print 'loaded ' + str(counts[table]) + ' records into ' + table + ' table'
+
+    print 'loaded ' + str(total) + ' records with ' + str(workers) + ' workers in ' + ('%.1f' % elapsed) + ' seconds (' + str(int(total / max(elapsed, 0.001))) + ' rows/sec)\n'
+
+    return counts
+
+
+def set_bulk_load_pragmas(con):
+    """
+    This function sets the BULK_LOAD_PRAGMAS on a connection.  They only last as long as the connection.
+
+    Parameters:
+        1 - SQLite connection
+    """
+
+    for pragma in BULK_LOAD_PRAGMAS:
+        con.execute(pragma)
+
+
+def create_indexes(con, table, indexes):
+    """
+    This function creates an index named <table>_<column> on each of the listed columns of a table.
+
+    Parameters:
+        1 - SQLite connection
+        2 - string name of the table
+        3 - list of column names (can be None)
+    """
+
+    for column in indexes or []:
+        con.execute('''CREATE INDEX IF NOT EXISTS ''' + table + '_' + column + ''' ON ''' + table + '''(''' + column + ''')''')
+
+
+def analyze(database):
+    """
+    This function runs ANALYZE on the whole database so that SQLite's query planner has statistics
+    for every table and index.  Run it after loading or changing a lot of data.
+
+    Parameters:
+        1 - string file path of database
+    """
+
+    con = sqlite3.connect(database)
+
+    con.execute('''ANALYZE''')
+    con.commit()
+
+    con.close()
+
+
+def is_typed(con):
+    """
+    This function checks whether a database has been converted by convert_to_typed_schema().
+
+    Parameters:
+        1 - SQLite connection
+
+    Returns:
+        True if the database has the typed schema
+    """
+
+    return con.execute('''PRAGMA user_version''').fetchone()[0] == TYPED_SCHEMA_VERSION
+
+
+def hex_to_int(value):
+    """
+    This function converts a Mode S hex code to the 24-bit integer stored as the hex key of a typed
+    database.  It is also registered as the hex_to_int() SQL function by hex_key_expression().
+
+    Parameters:
+        1 - hex code string (surrounding whitespace is ignored)
+
+    Returns:
+        The hex code as an integer, or None if it isn't a valid 24-bit hex code
+    """
+
+    try:
+        key = int(value, 16)
+    except (TypeError, ValueError):
+        return None
+
+    if key < 0 or key > 0xFFFFFF:
+        return None
+
+    return key
+
+
+def hex_key_expression(con, column='faa_master.mode_s_code_hex'):
+    """
+    This function returns the SQL expression that turns a mode_s_code_hex value into a hex key: the
+    trimmed, uppercase string, or the integer from hex_to_int() in a typed database (the function is
+    registered on the connection for that).  Either way it's NULL when there's no hex code.
+
+    Parameters:
+        1 - SQLite connection
+        2 - the column holding the hex code (optional)
+
+    Returns:
+        String SQL expression
+    """
+
+    if is_typed(con):
+        con.create_function('hex_to_int', 1, hex_to_int)
+        return '''hex_to_int(''' + column + ''')'''
+
+    return '''NULLIF(UPPER(TRIM(''' + column + ''')), '')'''
+
+
+def convert_to_typed_schema(database):
+    """
+    This function rebuilds the FAA tables of a database loaded with the all TEXT schema into a more
+    compact one.  Every value is trimmed, with empty values stored as NULL.  The numeric columns in
+    TYPED_COLUMNS are declared INTEGER, so numbers are stored as integers (a value that isn't a number
+    is still kept as text), and codes with leading zeros stay TEXT.  The tables in WITHOUT_ROWID_KEYS
+    are stored as WITHOUT ROWID tables keyed by that column, so the key isn't stored twice in a separate
+    index.  faa_master keeps its rowids, since the first row for a repeated hex code is the one that's
+    used.  Then the hex_key column and aircraft_profile table are rebuilt with the hex code as a 24-bit
+    integer instead of a string, and the database is vacuumed to give back the space saved.  The
+    database's user_version is set to TYPED_SCHEMA_VERSION so lookups know to use integer hex keys.
+    A database that already has the typed schema is left as it is.
+
+    Parameters:
+        1 - string file path of database
+    """
+
+    start = time.time()
+
+    con = sqlite3.connect(database)
+    con.isolation_level = None
+
+    if is_typed(con):
+        print database + ' already has the typed schema\n'
+        con.close()
+        return
+
+    tables = [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    con.execute('''BEGIN''')
+
+    for table, member, key_column in FAA_FILES:
+
+        if table not in tables:
+            continue
+
+        # hex_key is added again by add_hex_key() below
+        columns = [row[1] for row in con.execute('''PRAGMA table_info(''' + table + ''')''') if row[1] != 'hex_key']
+        integer_columns = TYPED_COLUMNS.get(table, [])
+
+        fields_for_create = ','.join([column + (' INTEGER' if column.lower() in integer_columns else ' TEXT') for column in columns])
+        values = ','.join(['''NULLIF(TRIM(''' + column + '''), '')''' for column in columns])
+
+        if table in WITHOUT_ROWID_KEYS:
+            create_statement = ('''CREATE TABLE ''' + table + '''_typed(''' + fields_for_create + ''', PRIMARY KEY(''' + WITHOUT_ROWID_KEYS[table] + ''')) WITHOUT ROWID''')
+            select_statement = ('''SELECT ''' + values + ''' FROM ''' + table + ''' WHERE NULLIF(TRIM(''' + WITHOUT_ROWID_KEYS[table] + '''), '') IS NOT NULL ORDER BY rowid''')
+        else:
+            create_statement = ('''CREATE TABLE ''' + table + '''_typed(''' + fields_for_create + ''')''')
+            select_statement = ('''SELECT ''' + values + ''' FROM ''' + table + ''' ORDER BY rowid''')
+
+        con.execute(create_statement)
+
+        # A repeated key in a WITHOUT ROWID table keeps the first row
+        con.execute('''INSERT OR IGNORE INTO ''' + table + '''_typed ''' + select_statement)
+
+        con.execute('''DROP TABLE ''' + table)
+        con.execute('''ALTER TABLE ''' + table + '''_typed RENAME TO ''' + table)
+
+        # Dropping the table dropped its index too
+        if table not in WITHOUT_ROWID_KEYS:
+            create_indexes(con, table, [key_column])
+
+    con.execute('''PRAGMA user_version = ''' + str(TYPED_SCHEMA_VERSION))
+
+    con.execute('''COMMIT''')
+
+    con.close()
+
+    add_hex_key(database)
+    create_aircraft_profile(database)
+
+    con = sqlite3.connect(database)
+    con.execute('''VACUUM''')
+    con.close()
+
+    print 'converted ' + database + ' to the typed schema in ' + ('%.1f' % (time.time() - start)) + ' seconds\n'
+
+
+def add_hex_key(database):
+    """
+    This function adds a hex_key column to the faa_master table that holds the trimmed, uppercase
+    mode_s_code_hex (or the hex code as an integer in a typed database), and gives it a unique index so that aircraft can be looked up by an exact match
+    instead of a LIKE prefix scan of the whole table.  An index on faa_acftref.code is also added for
+    the join that finds an aircraft's type.  It is safe to run more than once, so it also works as the
+    migration for databases that were loaded before the hex_key column existed.
+
+    Parameters:
+        1 - string file path of database
+    """
+
+    con = sqlite3.connect(database)
+
+    columns = [row[1] for row in con.execute('''PRAGMA table_info(faa_master)''')]
+
+    if 'hex_key' not in columns:
+        if is_typed(con):
+            con.execute('''ALTER TABLE faa_master ADD COLUMN hex_key INTEGER''')
+        else:
+            con.execute('''ALTER TABLE faa_master ADD COLUMN hex_key TEXT''')
+
+    # Aircraft without a Mode S code get NULL, which the unique index allows more than once
+    con.execute('''UPDATE faa_master SET hex_key = ''' + hex_key_expression(con))
+
+    # If a hex code is listed more than once, keep the first row (the one the LIKE lookup used to find)
+    con.execute('''UPDATE faa_master SET hex_key = NULL
+                   WHERE hex_key IS NOT NULL
+                   AND rowid NOT IN (SELECT MIN(rowid) FROM faa_master WHERE hex_key IS NOT NULL GROUP BY hex_key)''')
+
+    con.execute('''CREATE UNIQUE INDEX IF NOT EXISTS faa_master_hex_key ON faa_master(hex_key)''')
+
+    # A WITHOUT ROWID faa_acftref table is already keyed by code
+    if not is_typed(con):
+        con.execute('''CREATE INDEX IF NOT EXISTS faa_acftref_code ON faa_acftref(code)''')
+
+    con.commit()
+
+    print 'hex_key column and indexes are up to date in ' + database + '\n'
+
+    con.close()
+
+
+def create_aircraft_profile(database):
+    """
+    This function builds the aircraft_profile table, which holds everything the tracker looks up about
+    an aircraft in one row keyed by its hex code: registration (N-number), registrant, manufacturer,
+    model, aircraft type code, and number of engines.  The strings are trimmed and faa_master is joined
+    with faa_acftref here, once, so that a lookup is a single primary key read instead of a join.
+    The table is dropped and rebuilt each time this is run, so run it again after reloading the FAA data.
+
+    Parameters:
+        1 - string file path of database
+    """
+
+    con = sqlite3.connect(database)
+
+    count = build_aircraft_profile(con)
+
+    con.commit()
+
+    print 'aircraft_profile table built with ' + str(count) + ' aircraft\n'
+
+    con.close()
+
+
+def build_aircraft_profile(con):
+    """
+    This function drops and rebuilds the aircraft_profile table (see create_aircraft_profile()) on an
+    open connection without committing, so it can be part of a bigger transaction.
+
+    Parameters:
+        1 - SQLite connection
+
+    Returns:
+        The number of aircraft in the table
+    """
+
+    con.execute('''DROP TABLE IF EXISTS aircraft_profile''')
+
+    # In a typed database the hex code is an integer primary key, which is the table's rowid
+    if is_typed(con):
+        key_definition = '''hex INTEGER PRIMARY KEY'''
+        table_options = ''''''
+    else:
+        key_definition = '''hex TEXT PRIMARY KEY'''
+        table_options = ''' WITHOUT ROWID'''
+
+    con.execute('''CREATE TABLE aircraft_profile(
+                       ''' + key_definition + ''',
+                       registration TEXT,
+                       registrant TEXT,
+                       manufacturer TEXT,
+                       model TEXT,
+                       type_aircraft TEXT,
+                       engine_count INTEGER
+                   )''' + table_options)
+
+    hex_key = hex_key_expression(con)
+
+    # If a hex code is listed more than once, the first row is kept (INSERT OR IGNORE in rowid order)
+    con.execute('''INSERT OR IGNORE INTO aircraft_profile
+                   SELECT
+                       ''' + hex_key + ''',
+                       'N' || TRIM(faa_master.n_number),
+                       TRIM(faa_master.name),
+                       TRIM(faa_acftref.mfr),
+                       TRIM(faa_acftref.model),
+                       TRIM(faa_acftref.type_acft),
+                       CAST(TRIM(faa_acftref.no_eng) AS INTEGER)
+                   FROM faa_master
+                   LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code
+                   WHERE ''' + hex_key + ''' IS NOT NULL
+                   ORDER BY faa_master.rowid''')
+
+    return con.execute('''SELECT COUNT(*) FROM aircraft_profile''').fetchone()[0]
+
+
+def refresh_tables(database, sources, chunk_size=10000):
+    """
+    This function updates existing tables from a new copy of the FAA data without dropping them, so a
+    running tracker can keep looking up aircraft while the data is refreshed.  Each source's rows are
+    first loaded into a temporary staging table, then compared with the current table by its key column,
+    and only the rows that were added, changed, or removed are applied.  The changes to every table, the
+    hex_key column, and the aircraft_profile table (if they exist) are all made in one transaction with
+    the database in WAL mode, so lookups see either the old data or the new data and are never blocked.
+
+    Parameters:
+        1 - string file path of database (the tables must already exist, see load_text_file())
+        2 - list of (table name, iterator of rows, key column) tuples, where the first row is the field
+            names like load_rows() and the key column is unique in the table (n_number for faa_master,
+            code for faa_acftref)
+        3 - number of rows to insert into a staging table at a time (optional)
+
+    Returns:
+        Dictionary of (inserted, updated, deleted) counts keyed by table name
+    """
+
+    start = time.time()
+
+    con = sqlite3.connect(database)
+    con.isolation_level = None
+
+    # Readers aren't blocked by a writer in WAL mode, and keep reading the old data until the commit
+    con.execute('''PRAGMA journal_mode = WAL''')
+    con.execute('''PRAGMA temp_store = MEMORY''')
+
+    counts = {}
+
+    writing = False
+
+    try:
+        # Load the staging tables before starting the write transaction, so the database is only
+        # locked for writing while the changes are applied
+        for table, rows, key_column in sources:
+            stage_rows(con, table, rows, chunk_size)
+
+        con.execute('''BEGIN IMMEDIATE''')
+        writing = True
+
+        for table, rows, key_column in sources:
+            counts[table] = apply_staged_rows(con, table, key_column)
+
+        columns = [row[1] for row in con.execute('''PRAGMA table_info(faa_master)''')]
+
+        if 'hex_key' in columns:
+            # Rows that were just inserted have no hex_key yet.  If another row already has the same hex
+            # code, the unique index makes the update skip the new row, so the first row is still kept.
+            con.execute('''UPDATE OR IGNORE faa_master SET hex_key = ''' + hex_key_expression(con) + '''
+                           WHERE hex_key IS NULL''')
+
+        tables = [row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+        if 'aircraft_profile' in tables:
+            build_aircraft_profile(con)
+
+        con.execute('''COMMIT''')
+        writing = False
+
+    except:
+        # Nothing is changed if any part of the refresh fails
+        if writing:
+            con.execute('''ROLLBACK''')
+        raise
+
+    finally:
+        con.close()
+
+    for table in sorted(counts):
+        inserted, updated, deleted = counts[table]
+        print table + ' refreshed: ' + str(inserted) + ' inserted, ' + str(updated) + ' updated, ' + str(deleted) + ' deleted'
+
+    print 'refresh finished in ' + ('%.1f' % (time.time() - start)) + ' seconds\n'
+
+    return counts
+
+
+def stage_rows(con, table, rows, chunk_size=10000):
+    """
+    This function loads rows into a temporary table named <table>_staging for refresh_tables().
+    The rows must have the same field names as the existing table.
+
+    Parameters:
+        1 - SQLite connection (the staging table only exists for this connection)
+        2 - string name of the existing table the rows are for
+        3 - iterator of rows, and the first row must be the field names of the table
+        4 - number of rows to insert at a time (optional)
+    """
+
+    rows = iter(rows)
+
+    headers = next(rows)
+
+    # hex_key is added to faa_master after loading, so it isn't in the FAA files
+    info = [row for row in con.execute('''PRAGMA table_info(''' + table + ''')''') if row[1] != 'hex_key']
+    columns = [row[1] for row in info]
+
+    if [header.lower() for header in headers] != [column.lower() for column in columns]:
+        raise ValueError('the fields in the new ' + table + ' data do not match the table, load it again with load_text_file() instead')
+
+    staging_table = table + '_staging'
+
+    con.execute('''DROP TABLE IF EXISTS temp.''' + staging_table)
+    # The staging table has the same column types as the table, and in a typed database the values are
+    # trimmed the same way convert_to_typed_schema() trims them, so unchanged rows compare as equal
+    con.execute('''CREATE TEMP TABLE ''' + staging_table + '''(''' + ','.join([row[1] + ' ' + (row[2] or 'TEXT') for row in info]) + ''')''')
+
+    if is_typed(con):
+        value = '''NULLIF(TRIM(?), '')'''
+    else:
+        value = '''?'''
+
+    insert_statement = ('''INSERT INTO temp.''' + staging_table + ''' VALUES(''' + ','.join([value] * len(columns)) + ''')''')
+
+    con.execute('''BEGIN''')
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+
+        if len(chunk) == 0:
+            break
+
+        con.executemany(insert_statement, chunk)
+
+    con.execute('''COMMIT''')
+
+
+def apply_staged_rows(con, table, key_column):
+    """
+    This function applies the differences between a table and its staging table (see stage_rows())
+    to the table.  It should be run inside a transaction.
+
+    Parameters:
+        1 - SQLite connection
+        2 - string name of the table
+        3 - key column that identifies a row in both tables
+
+    Returns:
+        Tuple of the number of rows (inserted, updated, deleted)
+    """
+
+    staging_table = 'temp.' + table + '_staging'
+
+    columns = ','.join([row[1] for row in con.execute('''PRAGMA temp.table_info(''' + table + '''_staging)''')])
+
+    con.execute('''CREATE INDEX IF NOT EXISTS temp.''' + table + '''_staging_key ON ''' + table + '''_staging(''' + key_column + ''')''')
+
+    # In a typed database a blank key was staged as NULL.  A WITHOUT ROWID table can't hold a NULL or
+    # repeated key, so those rows are dropped and a repeated key keeps the first row, the same way
+    # convert_to_typed_schema() builds the table.
+    if is_typed(con) and table in WITHOUT_ROWID_KEYS:
+        con.execute('''DELETE FROM ''' + staging_table + '''
+                       WHERE rowid NOT IN (SELECT MIN(rowid) FROM ''' + staging_table + '''
+                                           WHERE ''' + key_column + ''' IS NOT NULL GROUP BY ''' + key_column + ''')''')
+
+    # Rows that are new or have a changed value
+    con.execute('''DROP TABLE IF EXISTS temp.changed_rows''')
+    con.execute('''CREATE TEMP TABLE changed_rows AS
+                   SELECT ''' + columns + ''' FROM ''' + staging_table + ''' WHERE ''' + key_column + ''' IS NOT NULL
+                   EXCEPT
+                   SELECT ''' + columns + ''' FROM ''' + table)
+    con.execute('''CREATE INDEX temp.changed_rows_key ON changed_rows(''' + key_column + ''')''')
+
+    # Rows that aren't in the new data anymore (a NULL in the NOT IN list would make it match nothing)
+    deleted = con.execute('''DELETE FROM ''' + table + '''
+                             WHERE ''' + key_column + ''' NOT IN (SELECT ''' + key_column + ''' FROM ''' + staging_table + '''
+                                                         WHERE ''' + key_column + ''' IS NOT NULL)''').rowcount
+
+    # Changed rows are replaced, and new rows are inserted
+    updated = con.execute('''DELETE FROM ''' + table + '''
+                             WHERE ''' + key_column + ''' IN (SELECT ''' + key_column + ''' FROM temp.changed_rows)''').rowcount
+
+    inserted = con.execute('''INSERT INTO ''' + table + '''(''' + columns + ''') SELECT ''' + columns + ''' FROM temp.changed_rows''').rowcount - updated
+
+    con.execute('''DROP TABLE temp.changed_rows''')
+    con.execute('''DROP TABLE ''' + staging_table)
+
+    return (inserted, updated, deleted)
+
+
+def refresh_text_files(database, files, chunk_size=10000):
+    """
+    This function refreshes existing tables from comma delimited .txt files (see refresh_tables()).
+
+    Parameters:
+        1 - string file path of database
+        2 - list of (table name, .txt file path, key column) tuples
+        3 - number of rows to insert into a staging table at a time (optional)
+
+    Returns:
+        Dictionary of (inserted, updated, deleted) counts keyed by table name
+    """
+
+    return refresh_tables(database, [(table, read_text_file(filename), key_column) for table, filename, key_column in files], chunk_size)
+
+
+# First 8 bytes of a binary index file created by export_binary_index()
+BINARY_INDEX_MAGIC = 'FAAIDX01'
+
+
+def export_binary_index(database, filename):
+    """
+    This function compiles faa_master joined with faa_acftref into a compact binary index file that
+    can be memory mapped and binary searched by lib/binary_index.py, for receivers where even SQLite is
+    more than is needed.  The file layout (all numbers big-endian) is:
+
+        header:        8 byte magic, 4 byte number of records, 4 byte offset of the string table
+        records:       sorted by hex code, 11 bytes each: 3 byte hex code (24-bit integer),
+                       4 byte offset of the model string, 4 byte offset of the registrant string
+        string table:  each string stored once, as a 1 byte length followed by the string
+
+    Parameters:
+        1 - string file path of database
+        2 - string file path of the binary index file to create
+    """
+
+    con = sqlite3.connect(database)
+
+    columns = [row[1] for row in con.execute('''PRAGMA table_info(faa_master)''')]
+
+    if 'hex_key' in columns:
+        key_column = 'faa_master.hex_key'
+    else:
+        key_column = 'UPPER(TRIM(faa_master.mode_s_code_hex))'
+
+    select_statement = ('''SELECT ''' + key_column + ''', faa_acftref.model, faa_master.name
+                           FROM faa_master
+                           LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code
+                           ORDER BY faa_master.rowid''')
+
+    records = {}
+    strings = {}
+    string_table = []
+    string_table_size = 0
+
+    for hex_code, model, name in con.execute(select_statement):
+
+        # Skip aircraft without a valid 24-bit Mode S code, and keep the first row for a repeated code
+        # (the hex key is already an integer in a typed database)
+        if isinstance(hex_code, (int, long)):
+            key = hex_code
+        else:
+            key = hex_to_int(hex_code)
+
+        if key is None or key in records:
+            continue
+
+        offsets = []
+
+        for value in [model, name]:
+            value = (value or '').rstrip().encode('utf-8')
+
+            # The length has to fit in 1 byte, so long strings are cut at 255 bytes, dropping the
+            # rest of a multibyte character that would otherwise be split
+            if len(value) > 255:
+                value = value[:255].decode('utf-8', 'ignore').encode('utf-8')
+
+            # Each distinct string is only stored once
+            if value not in strings:
+                strings[value] = string_table_size
+                string_table.append(chr(len(value)) + value)
+                string_table_size += 1 + len(value)
+
+            offsets.append(strings[value])
+
+        records[key] = offsets
+
+    con.close()
+
+    string_table_offset = 16 + len(records) * 11
+
+    with open(filename, 'wb') as f:
+        f.write(BINARY_INDEX_MAGIC + struct.pack('>II', len(records), string_table_offset))
+
+        for key in sorted(records):
+            f.write(struct.pack('>I', key)[1:] + struct.pack('>II', records[key][0], records[key][1]))
+
+        f.write(''.join(string_table))
+
+    print 'exported ' + str(len(records)) + ' aircraft and ' + str(len(strings)) + ' strings to ' + filename + '\n'
@@ -1,62 +1,69 @@
+import sys
 import database_setup
 """
 Load data from FAA aircraft database .txt files to a SQLite database.
 http://www.faa.gov/licenses_certificates/aircraft_certification/aircraft_registry/releasable_aircraft_download/
 
-FAA .txt files require a little prep work before they can be loaded:
-1. Add a field/column header after the last comma called "BLANK" since every row ends with a comma
-2. Replace every hyphen in the column headers with underscores
-3. Find and replace hashtags with some other character (causes an error when saving to SQLite database)
-4. Convert the file to UTF-8 encoding instead of UTF-8-BOM
+The FAA .txt files are prepped while they're read (see database_setup.prepare_faa_rows()), so they
+can be loaded as downloaded, either extracted to the text_files directory or straight from the
+ReleasableAircraft.zip file.
+
+All of the registry files (MASTER, ACFTREF, ENGINE, DEREG, and DEALER) are parsed in parallel by
+worker processes, one per CPU (see database_setup.load_faa_files()).
+
+Usage: python faa_data_loader.py [--refresh] [--typed] [ReleasableAircraft.zip file path]
+By default the tables are dropped and loaded from scratch.  With --refresh, the tables in an existing
+database are updated in place with only the rows that were added, changed, or removed since the last
+load, so a tracker using the database can keep running while the FAA's daily update is applied.
+Only faa_master and faa_acftref, the tables lookups use, are refreshed.
+With --typed, a new load is converted to the compact typed schema (see
+database_setup.convert_to_typed_schema()).  A refresh keeps the schema the database already has.
 
 Uses the database_setup module.
 """
 # SQLite database where the .txt file data should be loaded into
 database = 'faa_database.db'
 
-#########################
-# Load FAA ACFTREF data #
-#########################
-
-table = 'faa_acftref'
-file = 'text_files/acftref.txt'
-
-# Get data from the .txt file
-data = database_setup.get_data_from_text_file(file)
-
-# Display some of the data to make sure it looks right
-print table + ' headers:'
-print data[0]
+# Directory the .txt files were extracted to, or the .zip file they're in if its path is given
+source = 'text_files'
 
-print '\n'
+arguments = [argument for argument in sys.argv[1:] if argument not in ['--refresh', '--typed']]
 
-print table + ' row 1:'
-print data[1]
+if len(arguments) > 0:
+    source = arguments[0]
 
-print '\n'
+# The worker processes import this script again on Windows, so it only runs in the main process
+if __name__ == '__main__':
 
-# Create a table in the database and save this dataset
-database_setup.create_table_and_insert(database, table, data)
+    if '--refresh' in sys.argv:
 
-########################
-# Load FAA MASTER data #
-########################
+        # The rows are matched by N-number in faa_master and by code in faa_acftref.  hex_key and the
+        # aircraft_profile table are updated in the same transaction as the changes.
+        database_setup.refresh_tables(database, [
+            ('faa_acftref', database_setup.read_faa_file(source, 'ACFTREF.txt'), 'code'),
+            ('faa_master', database_setup.read_faa_file(source, 'MASTER.txt'), 'n_number')
+        ])
 
-table = 'faa_master'
-file = 'text_files/master.txt'
+    else:
 
-data = database_setup.get_data_from_text_file(file)
+        # The files are loaded in bulk mode (rollback journal kept in memory, no syncing to disk) with the
+        # indexes built after the data is in.  A load that fails is rolled back, but if it's interrupted
+        # by a crash or power loss, delete the database and run this again.
+        database_setup.load_faa_files(database, source)
 
-print table + ' headers:'
-print data[0]
+        if '--typed' in sys.argv:
 
-print '\n'
+            # Rebuild the tables with INTEGER columns, trimmed strings, and integer hex keys
+            # (this also adds hex_key and builds the aircraft_profile table)
+            database_setup.convert_to_typed_schema(database)
 
-print table + ' row 1:'
-print data[1]
+        else:
 
-print '\n'
+            # Add the normalized hex_key column and indexes used for exact match lookups
+            database_setup.add_hex_key(database)
 
-database_setup.create_table_and_insert(database, table, data)
+            # Build the denormalized aircraft_profile table used for single read lookups
+            database_setup.create_aircraft_profile(database)
 
-    
\ No newline at end of file
+    # Update the query planner's statistics now that everything is loaded
+    database_setup.analyze(database)
@@ -0,0 +1,23 @@
+import sys
+import database_setup
+"""
+Export the FAA aircraft data in a SQLite database (created by faa_data_loader.py) to a compact,
+sorted binary index file.  Set DATABASE in radar_config.py to the index file to use it for lookups
+instead of the SQLite database, so the full database doesn't need to be copied to the receiver.
+
+Usage: python faa_index_export.py [database file path] [index file path]
+The defaults are faa_database.db and faa_index.idx in the current directory.
+
+Uses the database_setup module.
+"""
+# SQLite database to export from, and the binary index file to create
+database = 'faa_database.db'
+index_file = 'faa_index.idx'
+
+if len(sys.argv) > 1:
+    database = sys.argv[1]
+
+if len(sys.argv) > 2:
+    index_file = sys.argv[2]
+
+database_setup.export_binary_index(database, index_file)
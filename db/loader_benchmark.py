@@ -0,0 +1,71 @@
+import multiprocessing
+import os
+import sys
+import shutil
+import tempfile
+import time
+import benchmark_files
+import database_setup
+"""
+Times loading the FAA MASTER and ACFTREF files into a new database four ways: the original
+get_data_from_text_file() + create_table_and_insert(), the streaming load_text_file(),
+load_text_file() in bulk mode with the indexes built afterwards, and load_faa_files() parsing
+the files in parallel worker processes (one per CPU).  The files are synthetic (see benchmark_files).
+
+Usage: python loader_benchmark.py [number of MASTER rows]
+The default is 300000 rows, about the size of the real MASTER file.
+"""
+
+master_rows = 300000
+acftref_rows = benchmark_files.acftref_rows
+
+if len(sys.argv) > 1:
+    master_rows = int(sys.argv[1])
+
+
+def load_legacy(database, master_file, acftref_file):
+    database_setup.create_table_and_insert(database, 'faa_acftref', database_setup.get_data_from_text_file(acftref_file))
+    database_setup.create_table_and_insert(database, 'faa_master', database_setup.get_data_from_text_file(master_file))
+    database_setup.add_hex_key(database)
+
+
+def load_streaming(database, master_file, acftref_file):
+    database_setup.load_text_file(database, 'faa_acftref', acftref_file)
+    database_setup.load_text_file(database, 'faa_master', master_file)
+    database_setup.add_hex_key(database)
+
+
+def load_bulk(database, master_file, acftref_file):
+    database_setup.load_text_file(database, 'faa_acftref', acftref_file, bulk=True, indexes=['code'])
+    database_setup.load_text_file(database, 'faa_master', master_file, bulk=True, indexes=['n_number'])
+    database_setup.add_hex_key(database)
+    database_setup.analyze(database)
+
+
+def load_parallel(database, master_file, acftref_file):
+    database_setup.load_faa_files(database, os.path.dirname(master_file))
+    database_setup.add_hex_key(database)
+    database_setup.analyze(database)
+
+
+directory = tempfile.mkdtemp()
+
+master_file, acftref_file = benchmark_files.write_files(directory, master_rows)
+
+times = []
+
+for name, load in [('legacy', load_legacy), ('streaming', load_streaming), ('streaming bulk', load_bulk), ('parallel', load_parallel)]:
+    database = os.path.join(directory, name.replace(' ', '_') + '.db')
+
+    start = time.time()
+    load(database, master_file, acftref_file)
+    times.append((name, time.time() - start, os.path.getsize(database)))
+
+print 'MASTER rows:               ' + str(master_rows) + ' (' + str(os.path.getsize(master_file) // 1048576) + ' MB file)'
+print 'ACFTREF rows:              ' + str(acftref_rows)
+print 'CPUs:                      ' + str(multiprocessing.cpu_count())
+
+for name, elapsed, size in times:
+    print (name + ':').ljust(27) + ('%.2f' % elapsed) + ' s, ' + str(int((master_rows + acftref_rows) / elapsed)) + ' rows/sec, ' + str(size // 1048576) + ' MB database'
+
+shutil.rmtree(directory)
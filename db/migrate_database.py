@@ -0,0 +1,34 @@
+import sys
+import database_setup
+"""
+Upgrade an existing FAA database (created by faa_data_loader.py) to the current layout
+without reloading the FAA .txt files.
+
+Usage: python migrate_database.py [--typed] [database file path]
+The default database is faa_database.db in the current directory.
+With --typed, the tables are also converted to the compact typed schema
+(see database_setup.convert_to_typed_schema()).
+
+Uses the database_setup module.
+"""
+# SQLite database to upgrade
+database = 'faa_database.db'
+
+arguments = [argument for argument in sys.argv[1:] if argument != '--typed']
+
+if len(arguments) > 0:
+    database = arguments[0]
+
+if '--typed' in sys.argv:
+
+    # Rebuild the tables with INTEGER columns, trimmed strings, and integer hex keys
+    # (this also adds hex_key and builds the aircraft_profile table)
+    database_setup.convert_to_typed_schema(database)
+
+else:
+
+    # Add the normalized hex_key column and its unique index used for exact match lookups
+    database_setup.add_hex_key(database)
+
+    # Build the denormalized aircraft_profile table used for single read lookups
+    database_setup.create_aircraft_profile(database)
@@ -0,0 +1,90 @@
+import os
+import random
+import sqlite3
+import sys
+import shutil
+import tempfile
+import time
+import benchmark_files
+import database_setup
+
+sys.path.append(os.path.join('..', 'lib'))
+import aircraft_lookup
+"""
+Compares the all TEXT schema with the typed schema made by database_setup.convert_to_typed_schema():
+the size of the database file and the time per lookup of an aircraft's profile and type.  The FAA
+files are synthetic (see benchmark_files).  The lookup caches are skipped so that every lookup goes
+to the database.
+
+Usage: python schema_benchmark.py [number of MASTER rows]
+The default is 300000 rows, about the size of the real MASTER file.
+"""
+
+master_rows = 300000
+lookups = 20000
+
+if len(sys.argv) > 1:
+    master_rows = int(sys.argv[1])
+
+
+def time_lookups(database, hex_codes):
+    # Returns the ms per profile lookup and per type lookup, and the results
+    service = aircraft_lookup.LookupService(database)
+    service.get_aircraft_profile(hex_codes[0])  # open the connection before timing
+
+    start = time.time()
+    profiles = [service.get_aircraft_profile(hex_code) for hex_code in hex_codes]
+    profile_time = time.time() - start
+
+    start = time.time()
+    types = [service.get_aircraft_type(hex_code) for hex_code in hex_codes]
+    type_time = time.time() - start
+
+    service.close()
+
+    return (profile_time * 1000 / len(hex_codes), type_time * 1000 / len(hex_codes), profiles, types)
+
+
+directory = tempfile.mkdtemp()
+
+benchmark_files.write_files(directory, master_rows)
+
+results = []
+
+for name in ['TEXT', 'typed']:
+    database = os.path.join(directory, name + '.db')
+
+    database_setup.load_faa_files(database, directory)
+
+    start = time.time()
+
+    if name == 'typed':
+        database_setup.convert_to_typed_schema(database)
+    else:
+        database_setup.add_hex_key(database)
+        database_setup.create_aircraft_profile(database)
+
+        con = sqlite3.connect(database)
+        con.execute('VACUUM')
+        con.close()
+
+    setup_time = time.time() - start
+
+    # Random registered hex codes, and some that aren't registered
+    random.seed(1)
+    hex_codes = ['%06X' % (0xA00000 + random.randrange(master_rows * 2)) for n in range(lookups)]
+
+    profile_ms, type_ms, profiles, types = time_lookups(database, hex_codes)
+
+    results.append((name, os.path.getsize(database), setup_time, profile_ms, type_ms, profiles, types))
+
+print 'MASTER rows:               ' + str(master_rows)
+print 'lookups:                   ' + str(lookups)
+
+for name, size, setup_time, profile_ms, type_ms, profiles, types in results:
+    print (name + ' schema:').ljust(27) + ('%.1f' % (size / 1048576.0)) + ' MB, ' + ('%.3f' % profile_ms) + ' ms per profile lookup, ' + ('%.3f' % type_ms) + ' ms per type lookup (' + ('%.1f' % setup_time) + ' s to set up)'
+
+print 'size saved:                ' + ('%.0f' % (100 - results[1][1] * 100.0 / results[0][1])) + '%'
+print 'same results:              ' + str(results[0][5] == results[1][5] and results[0][6] == results[1][6])
+
+shutil.rmtree(directory)
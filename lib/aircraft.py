@@ -2,45 +2,50 @@ import aircraft_lookup
 """
 This module contains a class that represents an Aircraft object. There is a constructor
 to create a new Aircraft and a function to update the information about that Aircraft.
-"""
 
-class Aircraft:
+Aircraft objects use __slots__ instead of a per-instance __dict__ to keep them small when thousands
+are being tracked.  Numeric fields always hold numbers: lat/lon are only meaningful when validposition
+is 1 and track is only meaningful when validtrack is 1.  The flight and aircraft type strings are
+interned so that every aircraft with the same value shares one copy.
+"""
 
-	def __init__(self, message, database):
+class Aircraft(object):
+
+	__slots__ = (
+		'hex_code',
+		'flight',
+		'validposition',
+		'lat',
+		'lon',
+		'altitude',
+		'validtrack',
+		'track',
+		'speed',
+		'messages',
+		'seen',
+		'aircraft_type'
+	)
+
+	def __init__(self, message, database, aircraft_type=None):
 		"""
 		Constructor to create a new Aircraft object.
 
 		Parameters:
 			1 - message received from Mode S transponder in JSON format
 			2 - file path of database containing FAA's aircraft registration info
+			3 - the aircraft's type (optional), if it's already known the database lookup is skipped
 		"""
 
 		# Get whatever data is being broadcast by the aircraft's Mode S transponder
-		self.hex_code = str(message.get('hex')).upper()
-		self.flight = str(message.get('flight'))
-		if len(self.flight) == 0:
-			self.flight = 'N/A'
-
-		self.validposition = message.get('validposition')
-		self.lat = message.get('lat')
-		self.lon = message.get('lon')
-		if self.validposition == 0:
-			self.lat = 'N/A'
-			self.lon = 'N/A'
-
-		self.altitude = message.get('altitude')
-		self.validtrack = message.get('validtrack')
-		self.track = message.get('track')
-		if self.validtrack ==0:
-			self.track = 'N/A'
-
-		self.speed = message.get('speed')
-		self.messages = message.get('messages')
-		self.seen = message.get('seen')
+		self.hex_code = intern(str(message.get('hex')).upper())
+		self.update_info(message)
 
 		# Use the aircraft's hex code to identify its registrant and type based on FAA database
 		# self.aircraft_reg = aircraft_lookup.get_aircraft_registrant(database, self.hex_code)
-		self.aircraft_type = aircraft_lookup.get_aircraft_type(database, self.hex_code)
+		if aircraft_type is None:
+			aircraft_type = aircraft_lookup.get_aircraft_type(database, self.hex_code)
+
+		self.aircraft_type = intern(str(aircraft_type))
 
 
 	def update_info(self, message):
@@ -57,19 +62,29 @@ class Aircraft:
 		if len(self.flight) == 0:
 			self.flight = 'N/A'
 
-		self.validposition = message.get('validposition')
-		self.lat = message.get('lat')
-		self.lon = message.get('lon')
-		if self.validposition == 0:
-			self.lat = 'N/A'
-			self.lon = 'N/A'
+		self.flight = intern(self.flight)
+
+		# Position is stored as floats either way, but only used when validposition is 1
+		if message.get('validposition') == 1:
+			self.validposition = 1
+			self.lat = float(message.get('lat'))
+			self.lon = float(message.get('lon'))
+
+		else:
+			self.validposition = 0
+			self.lat = 0.0
+			self.lon = 0.0
 
 		self.altitude = message.get('altitude')
-		self.validtrack = message.get('validtrack')
-		self.track = message.get('track')
-		if self.validtrack ==0:
-			self.track = 'N/A'
-			
+
+		if message.get('validtrack') == 1:
+			self.validtrack = 1
+			self.track = message.get('track')
+
+		else:
+			self.validtrack = 0
+			self.track = 0
+
 		self.speed = message.get('speed')
 		self.messages = message.get('messages')
 		self.seen = message.get('seen')
@@ -87,16 +102,29 @@ class Aircraft:
 			String description of aircraft
 		"""
 
+		# Show N/A for the position and track if they aren't valid
+		if self.validposition == 1:
+			lat = self.lat
+			lon = self.lon
+		else:
+			lat = 'N/A'
+			lon = 'N/A'
+
+		if self.validtrack == 1:
+			track = self.track
+		else:
+			track = 'N/A'
+
 		# For each instance variable, convert to a string, then make sure it's not longer than x charcters
 		# then use ljust() or rjust() to pad with extra spaces if shorter than x characters
 		summary = (
 			(str(self.hex_code)[:6]).ljust(6) + '  ' +
 			(str(self.flight)[:8]).ljust(8) + '  ' +
 			(str(self.altitude)[:6]).ljust(6) + '  ' +
-			(str(self.lat)[:10]).ljust(10) + '  ' +
-			(str(self.lon)[:10]).ljust(10) + '  ' +
+			(str(lat)[:10]).ljust(10) + '  ' +
+			(str(lon)[:10]).ljust(10) + '  ' +
 			(str(self.speed)[:4]).ljust(4) + '  ' +
-			(str(self.track)[:3]).ljust(3) + '  ' +
+			(str(track)[:3]).ljust(3) + '  ' +
 			(str(self.seen)[:3]).ljust(3) + '  ' +
 			(str(self.aircraft_type)[:30]).ljust(20)
 		)
@@ -1,13 +1,138 @@
 import sqlite3
+import threading
+import binary_index
+import time
+from collections import OrderedDict
 """
 This module contains functions for looking up info about an aircraft using its
 mode S code/hex ID. The SQLite queries here assume that the aircraft database
 was setup with faa_data_loader.py script.
+
+Results are kept in bounded LRU caches so that an aircraft that drops out and reappears
+isn't looked up in the database again.  Hex codes that aren't in the database (foreign
+aircraft) are cached too, since looking them up again would give the same answer.
 """
 
+class LookupCache:
+
+	def __init__(self, maxsize=4096, ttl=None):
+		"""
+		Constructor to create a new LookupCache object, a least recently used cache.
+
+		Parameters:
+			1 - max number of results to keep (optional), the least recently used result is dropped after that
+			2 - number of seconds a result is kept before it has to be looked up again (optional),
+			    default is to keep results until they are dropped for space
+		"""
+
+		self.maxsize = maxsize
+		self.ttl = ttl
+
+		# (result, time stored) keyed by (database, hex code), least recently used first
+		self.entries = OrderedDict()
+
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+		# Lookups can happen on more than one thread (the poller, enrichment workers, etc.)
+		self.lock = threading.Lock()
+
+
+	def get(self, key):
+		"""
+		Returns the cached result for the key, or None if there isn't one (or it's too old).
+
+		Parameters:
+			1 - the cache key
+		"""
+
+		with self.lock:
+			entry = self.entries.pop(key, None)
+
+			if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+				entry = None
+				self.evictions += 1
+
+			if entry is None:
+				self.misses += 1
+				return None
+
+			# Put the entry back at the most recently used end
+			self.entries[key] = entry
+			self.hits += 1
+
+			return entry[0]
+
+
+	def put(self, key, result):
+		"""
+		Stores a result, dropping the least recently used result if the cache is full.
+
+		Parameters:
+			1 - the cache key
+			2 - the result to store
+		"""
+
+		with self.lock:
+			self.entries.pop(key, None)
+			self.entries[key] = (result, time.time())
+
+			while len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+				self.evictions += 1
+
+
+	def clear(self):
+		"""
+		Removes every result from the cache (the counters are kept).
+		"""
+
+		with self.lock:
+			self.entries.clear()
+
+
+# Caches for the results of get_aircraft_type() and get_aircraft_registrant(), these can be replaced
+# with differently sized caches, for example: aircraft_lookup.type_cache = LookupCache(1000, 3600)
+type_cache = LookupCache()
+registrant_cache = LookupCache()
+profile_cache = LookupCache()
+
+# PRAGMA user_version of a database with integer hex keys (same as database_setup.TYPED_SCHEMA_VERSION)
+TYPED_SCHEMA_VERSION = 1
+
+# Keys of the dictionary returned by get_aircraft_profile(), in the same order as the aircraft_profile table's columns
+PROFILE_FIELDS = ('hex', 'registration', 'registrant', 'manufacturer', 'model', 'type_aircraft', 'engine_count')
+
+# LookupService for each database, keyed by database file path
+services = {}
+services_lock = threading.Lock()
+
+
+def text(value, missing=None):
+	"""
+	Returns a value from the database as a string with trailing whitespace removed.
+	Names with non-ASCII characters are loaded as unicode, and are encoded as UTF-8.
+	If missing is given, it's returned instead of a NULL or blank value (like the binary index does).
+	"""
+
+	if value is None and missing is not None:
+		return missing
+
+	if isinstance(value, unicode):
+		value = value.encode('utf-8').rstrip()
+	else:
+		value = str(value).rstrip()
+
+	if len(value) == 0 and missing is not None:
+		return missing
+
+	return value
+
+
 def get_aircraft_type(database, mode_s_code_hex):
 	"""
-	Looks up an aircraft's type based on the mode_s_code_hex in the FAA's database.  
+	Looks up an aircraft's type, using the cached result if there is one.
 	Example: BOEING 747-47UF or A319-132
 
 	Parameters:
@@ -15,51 +140,156 @@ def get_aircraft_type(database, mode_s_code_hex):
 		2 - mode_s_code_hex (must be all uppercase string)
 
 	Returns:
-		The aircraft's type
+		The aircraft's type, or MODEL? if it's not in the database
 	"""
 
-	# Some lines of code are commented out because this function was originally written
-	# to return an aicraft's manufacturer + model, but now it just returns the model.
-	# The plan is to add a function that specifically returns manufacturer later.
+	key = (database, mode_s_code_hex)
 
-	# Connect to the database
-	conn = sqlite3.connect(database)
+	aircraft_type = type_cache.get(key)
 
-	select_statement = (
-		'SELECT '
-			#'IFNULL(faa_acftref.mfr, "MFR?"), '
-			'IFNULL(faa_acftref.model, "MODEL?") '
-		'FROM faa_master '
-			'LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code '
-		'WHERE faa_master.mode_s_code_hex LIKE "' + mode_s_code_hex + '%";')
+	if aircraft_type is None:
+		aircraft_type = query_aircraft_type(database, mode_s_code_hex)
+		type_cache.put(key, aircraft_type)
 
-	results = conn.execute(select_statement)
+	return aircraft_type
 
-	# Get the one and only row of the results set
-	result = results.fetchone()
 
-	conn.close()
+def get_aircraft_registrant(database, mode_s_code_hex):
+	"""
+	Looks up an aircraft's registrant's name, using the cached result if there is one.
+	Example: FEDERAL EXPRESS CORP (a FedEx plane)
 
-	# In the event that no results at all are returned
-	if result is not None:
-		# Create strings of manufacturer & model with trailing whitespace removed
-		#mfr = str(result[0]).rstrip()
-		model = str(result[0]).rstrip()
+	Parameters:
+		1 - database file path
+		2 - mode_s_code_hex (must be all uppercase string)
 
-	else:
-		#mfr = "MFR?"
-		model = "MODEL?"
+	Returns:
+		The aircraft's registrant, or REG? if it's not in the database
+	"""
 
-	#aircraft_type = mfr + " " + model
+	key = (database, mode_s_code_hex)
 
-	#return aircraft_type
-	return model
+	registrant = registrant_cache.get(key)
 
+	if registrant is None:
+		registrant = query_aircraft_registrant(database, mode_s_code_hex)
+		registrant_cache.put(key, registrant)
 
-def get_aircraft_registrant(database, mode_s_code_hex):
+	return registrant
+
+
+def get_aircraft_profile(database, mode_s_code_hex):
+	"""
+	Looks up everything known about an aircraft in a single read, using the cached result if there is one.
+	The dictionary returned is shared with the cache, so it shouldn't be changed.
+
+	Parameters:
+		1 - database file path
+		2 - mode_s_code_hex (must be all uppercase string)
+
+	Returns:
+		Dictionary with the aircraft's hex, registration, registrant, manufacturer, model,
+		type_aircraft, and engine_count, or None if it's not in the database
+	"""
+
+	key = (database, mode_s_code_hex)
+
+	profile = profile_cache.get(key)
+
+	if profile is None:
+		profile = get_service(database).get_aircraft_profile(mode_s_code_hex)
+
+		# Aircraft that aren't in the database are cached as an empty dictionary
+		if profile is None:
+			profile = {}
+
+		profile_cache.put(key, profile)
+
+	if len(profile) == 0:
+		return None
+
+	return profile
+
+
+def get_aircraft_types(database, hex_codes):
+	"""
+	Looks up the types of several aircraft at once.  Cached results are used where there are
+	any, and all of the rest are found with as few database queries as possible.
+
+	Parameters:
+		1 - database file path
+		2 - list (or set) of mode_s_code_hex codes (must be all uppercase strings)
+
+	Returns:
+		Dictionary of aircraft types keyed by hex code (MODEL? for aircraft not in the database)
+	"""
+
+	aircraft_types = {}
+	missing = []
+
+	for mode_s_code_hex in hex_codes:
+		aircraft_type = type_cache.get((database, mode_s_code_hex))
+
+		if aircraft_type is None:
+			missing.append(mode_s_code_hex)
+		else:
+			aircraft_types[mode_s_code_hex] = aircraft_type
+
+	if len(missing) > 0:
+		found = get_service(database).get_aircraft_types(missing)
+
+		for mode_s_code_hex in missing:
+			type_cache.put((database, mode_s_code_hex), found[mode_s_code_hex])
+
+		aircraft_types.update(found)
+
+	return aircraft_types
+
+
+def get_service(database):
+	"""
+	Returns the LookupService for a database, creating it the first time it's needed.
+	If the file is a binary index (created by db/faa_index_export.py), a BinaryIndex is used instead.
+
+	Parameters:
+		1 - database file path
+
+	Returns:
+		The database's LookupService (or BinaryIndex)
+	"""
+
+	with services_lock:
+		service = services.get(database)
+
+		if service is None:
+			if binary_index.is_binary_index(database):
+				service = binary_index.BinaryIndex(database)
+			else:
+				service = LookupService(database)
+
+			services[database] = service
+
+	return service
+
+
+def query_aircraft_type(database, mode_s_code_hex):
+	"""
+	Looks up an aircraft's type based on the mode_s_code_hex in the FAA's database (skipping the cache).
+
+	Parameters:
+		1 - database file path
+		2 - mode_s_code_hex (must be all uppercase string)
+
+	Returns:
+		The aircraft's type
 	"""
-	Looks up an aircraft's registrant's name based on the mode_s_code_hex
-	in the FAA's database.  Example: FEDERAL EXPRESS CORP (a FedEx plane)
+
+	return get_service(database).get_aircraft_type(mode_s_code_hex)
+
+
+def query_aircraft_registrant(database, mode_s_code_hex):
+	"""
+	Looks up an aircraft's registrant's name based on the mode_s_code_hex in the FAA's database (skipping the cache).
 
 	Parameters:
 		1 - database file path
@@ -69,28 +299,333 @@ def get_aircraft_registrant(database, mode_s_code_hex):
 		The aircraft's registrant
 	"""
 
-	# Connect to the database
-	conn = sqlite3.connect(database)
+	return get_service(database).get_aircraft_registrant(mode_s_code_hex)
 
-	select_statement = (
-		'SELECT '
-			'IFNULL(faa_master.name, "REG?") '
-		'FROM faa_master '
-		'WHERE faa_master.mode_s_code_hex LIKE "' + mode_s_code_hex + '%";')
 
-	results = conn.execute(select_statement)
+class LookupService:
 
-	# Get the one and only row of the results set
-	result = results.fetchone()
+	def __init__(self, database, mmap_size=268435456, cache_size=16384):
+		"""
+		Constructor to create a new LookupService object, which keeps a long-lived, read-only connection
+		to the database open for each thread that does lookups (SQLite connections can't be shared
+		between threads) instead of opening a new connection for every lookup.
 
-	conn.close()
+		Parameters:
+			1 - database file path
+			2 - max number of bytes of the database file to memory map (optional)
+			3 - size of each connection's page cache in KB (optional)
+		"""
 
-	# In the event that no results at all are returned
-	if result is not None:
-		# Create string of registrant name with trailing whitespace removed
-		registrant = str(result[0]).rstrip()
+		self.database = database
+		self.mmap_size = mmap_size
+		self.cache_size = cache_size
 
-	else:
-		registrant = "REG?"
+		# Holds each thread's connection
+		self.local = threading.local()
 
-	return registrant
+		# Max number of hex codes in one batch lookup query (SQLite allows 999 parameters by default)
+		self.batch_size = 500
+
+		# What the database has been set up with, checked when the first connection is opened.
+		# The aircraft_profile table (database_setup.create_aircraft_profile) is used if it's there,
+		# then the indexed hex_key column (database_setup.add_hex_key), and older databases fall back
+		# to a LIKE prefix scan of faa_master.
+		self.has_profile = None
+		self.has_hex_key = None
+
+		# In a database converted by database_setup.convert_to_typed_schema, the hex keys are integers
+		self.integer_keys = None
+
+
+	def get_connection(self):
+		"""
+		Returns the calling thread's connection, opening it the first time.
+		"""
+
+		conn = getattr(self.local, 'conn', None)
+
+		if conn is None:
+			conn = sqlite3.connect(self.database)
+
+			# Lookups never write, and reads are faster with a memory mapped file and a bigger page cache
+			conn.execute('PRAGMA query_only = ON')
+			conn.execute('PRAGMA mmap_size = ' + str(int(self.mmap_size)))
+			conn.execute('PRAGMA cache_size = -' + str(int(self.cache_size)))
+
+			if self.has_hex_key is None:
+				tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+				columns = [row[1] for row in conn.execute('PRAGMA table_info(faa_master)')]
+
+				self.has_profile = 'aircraft_profile' in tables
+				self.has_hex_key = 'hex_key' in columns
+				self.integer_keys = conn.execute('PRAGMA user_version').fetchone()[0] == TYPED_SCHEMA_VERSION
+
+			self.local.conn = conn
+
+		return conn
+
+
+	def close(self):
+		"""
+		Closes the calling thread's connection (it will be opened again if it's needed).
+		"""
+
+		conn = getattr(self.local, 'conn', None)
+
+		if conn is not None:
+			conn.close()
+			self.local.conn = None
+
+
+	def hex_condition(self, mode_s_code_hex):
+		"""
+		Returns the WHERE condition that finds an aircraft in faa_master by its hex code, and the
+		parameters that go with it.
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			Tuple of (condition, tuple of parameters)
+		"""
+
+		if self.has_hex_key:
+			return ('faa_master.hex_key = ?', (self.lookup_key(mode_s_code_hex),))
+
+		return ("faa_master.mode_s_code_hex LIKE ? || '%'", (mode_s_code_hex,))
+
+
+	def lookup_key(self, mode_s_code_hex):
+		"""
+		Returns the value an aircraft's hex code is stored as in hex_key and aircraft_profile.hex:
+		the hex code itself, or the hex code as an integer in a typed database.
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+		"""
+
+		if self.integer_keys and self.has_hex_key:
+			try:
+				return int(mode_s_code_hex, 16)
+			except ValueError:
+				return -1  # not a hex code, so it won't match anything
+
+		return mode_s_code_hex
+
+
+	def get_aircraft_profile(self, mode_s_code_hex):
+		"""
+		Looks up everything known about an aircraft in one read of the aircraft_profile table
+		(or with a join of faa_master and faa_acftref if the database doesn't have that table).
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			Dictionary with the aircraft's hex, registration, registrant, manufacturer, model,
+			type_aircraft, and engine_count, or None if it's not in the database
+		"""
+
+		conn = self.get_connection()
+
+		if self.has_profile:
+			select_statement = (
+				'SELECT hex, registration, registrant, manufacturer, model, type_aircraft, engine_count '
+				'FROM aircraft_profile '
+				'WHERE hex = ?')
+
+			parameters = (self.lookup_key(mode_s_code_hex),)
+
+		else:
+			condition, condition_parameters = self.hex_condition(mode_s_code_hex)
+
+			select_statement = (
+				'SELECT '
+					'?, '
+					"'N' || TRIM(faa_master.n_number), "
+					'TRIM(faa_master.name), '
+					'TRIM(faa_acftref.mfr), '
+					'TRIM(faa_acftref.model), '
+					'TRIM(faa_acftref.type_acft), '
+					'CAST(TRIM(faa_acftref.no_eng) AS INTEGER) '
+				'FROM faa_master '
+					'LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code '
+				'WHERE ' + condition)
+
+			# The first parameter is the hex code selected as the profile's hex
+			parameters = (mode_s_code_hex,) + condition_parameters
+
+		result = conn.execute(select_statement, parameters).fetchone()
+
+		if result is None:
+			return None
+
+		profile = dict(zip(PROFILE_FIELDS, result))
+
+		# Strings are returned the same way as the other lookups (and the binary index) return them,
+		# with blank values as None
+		for field, value in profile.items():
+			if isinstance(value, basestring):
+				profile[field] = text(value) or None
+
+		# The hex code is always returned as a string, even when it's stored as an integer
+		profile['hex'] = mode_s_code_hex
+
+		return profile
+
+
+	def get_aircraft_type(self, mode_s_code_hex):
+		"""
+		Looks up an aircraft's type based on the mode_s_code_hex in the FAA's database.
+		Example: BOEING 747-47UF or A319-132
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			The aircraft's type, or MODEL? if it's not in the database
+		"""
+
+		# This function was originally written to return an aicraft's manufacturer + model,
+		# but now it just returns the model.  The plan is to add a function that specifically
+		# returns manufacturer later.
+
+		conn = self.get_connection()
+
+		# The hex code is passed as a parameter (never pasted into the SQL) so that the statement
+		# can be cached by the connection and a bad hex code can't change the query
+		if self.has_profile:
+			select_statement = (
+				"SELECT IFNULL(model, 'MODEL?') FROM aircraft_profile WHERE hex = ?")
+
+			parameters = (self.lookup_key(mode_s_code_hex),)
+
+		else:
+			condition, parameters = self.hex_condition(mode_s_code_hex)
+
+			select_statement = (
+				'SELECT '
+					"IFNULL(faa_acftref.model, 'MODEL?') "
+				'FROM faa_master '
+					'LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code '
+				'WHERE ' + condition)
+
+		# Get the one and only row of the results set
+		result = conn.execute(select_statement, parameters).fetchone()
+
+		# In the event that no results at all are returned
+		if result is not None:
+			# Create string of model with trailing whitespace removed
+			model = text(result[0], 'MODEL?')
+
+		else:
+			model = 'MODEL?'
+
+		return model
+
+
+	def get_aircraft_registrant(self, mode_s_code_hex):
+		"""
+		Looks up an aircraft's registrant's name based on the mode_s_code_hex
+		in the FAA's database.  Example: FEDERAL EXPRESS CORP (a FedEx plane)
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			The aircraft's registrant, or REG? if it's not in the database
+		"""
+
+		conn = self.get_connection()
+
+		if self.has_profile:
+			select_statement = (
+				"SELECT IFNULL(registrant, 'REG?') FROM aircraft_profile WHERE hex = ?")
+
+			parameters = (self.lookup_key(mode_s_code_hex),)
+
+		else:
+			condition, parameters = self.hex_condition(mode_s_code_hex)
+
+			select_statement = (
+				'SELECT '
+					"IFNULL(faa_master.name, 'REG?') "
+				'FROM faa_master '
+				'WHERE ' + condition)
+
+		# Get the one and only row of the results set
+		result = conn.execute(select_statement, parameters).fetchone()
+
+		# In the event that no results at all are returned
+		if result is not None:
+			# Create string of registrant name with trailing whitespace removed
+			registrant = text(result[0], 'REG?')
+
+		else:
+			registrant = 'REG?'
+
+		return registrant
+
+
+	def get_aircraft_types(self, hex_codes):
+		"""
+		Looks up the types of several aircraft with one query per batch of hex codes
+		instead of one query per aircraft.
+
+		Parameters:
+			1 - list of mode_s_code_hex codes (must be all uppercase strings)
+
+		Returns:
+			Dictionary of aircraft types keyed by hex code (MODEL? for aircraft not in the database)
+		"""
+
+		conn = self.get_connection()
+
+		# Without the hex_key column, compare against the trimmed mode_s_code_hex instead, which still
+		# scans the table but only once for the whole batch
+		if self.has_profile:
+			key_column = 'aircraft_profile.hex'
+			model_column = 'aircraft_profile.model'
+			from_clause = 'aircraft_profile'
+			order_by = 'aircraft_profile.hex'
+
+		else:
+			if self.has_hex_key:
+				key_column = 'faa_master.hex_key'
+			else:
+				key_column = 'UPPER(TRIM(faa_master.mode_s_code_hex))'
+
+			model_column = 'faa_acftref.model'
+			from_clause = 'faa_master LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code'
+			order_by = 'faa_master.rowid'
+
+		hex_codes = list(set(hex_codes))
+
+		# Hex codes keyed by the value they're stored as
+		keys = dict([(self.lookup_key(mode_s_code_hex), mode_s_code_hex) for mode_s_code_hex in hex_codes])
+		key_list = list(keys)
+
+		aircraft_types = {}
+
+		# SQLite limits the number of parameters in one statement, so the IN list is sent in batches
+		for start in range(0, len(key_list), self.batch_size):
+			batch = key_list[start:start + self.batch_size]
+
+			select_statement = (
+				'SELECT ' + key_column + ', IFNULL(' + model_column + ", 'MODEL?') "
+				'FROM ' + from_clause + ' '
+				'WHERE ' + key_column + ' IN (' + ','.join(['?'] * len(batch)) + ') '
+				'ORDER BY ' + order_by)
+
+			# If a hex code is listed more than once, keep the first row like the single lookup does
+			for key, model in conn.execute(select_statement, batch):
+				mode_s_code_hex = keys.get(key, key)
+
+				if mode_s_code_hex not in aircraft_types:
+					aircraft_types[mode_s_code_hex] = text(model, 'MODEL?')
+
+		for mode_s_code_hex in hex_codes:
+			if mode_s_code_hex not in aircraft_types:
+				aircraft_types[mode_s_code_hex] = 'MODEL?'
+
+		return aircraft_types
@@ -0,0 +1,88 @@
+import sys
+import benchmark_data
+from aircraft import *
+"""
+Compares the memory used by 10,000 Aircraft objects with the memory used by the same aircraft
+stored the way Aircraft used to store them (a per-instance __dict__, 'N/A' strings mixed in with
+numbers, and a separate copy of the type string for every aircraft).
+Run from the lib directory: python aircraft_memory_benchmark.py
+"""
+
+fleet_size = 10000
+
+aircraft_types = ['737-800', 'A319-132', 'A320-214', 'ERJ 170-200 LR', 'CL-600-2B19']
+
+
+class LegacyAircraft:
+
+	# Same fields and sentinel values as the original Aircraft class
+	def __init__(self, message, aircraft_type):
+		self.hex_code = str(message.get('hex')).upper()
+		self.flight = str(message.get('flight'))
+		self.validposition = message.get('validposition')
+		self.lat = message.get('lat')
+		self.lon = message.get('lon')
+		if self.validposition == 0:
+			self.lat = 'N/A'
+			self.lon = 'N/A'
+		self.altitude = message.get('altitude')
+		self.validtrack = message.get('validtrack')
+		self.track = message.get('track')
+		if self.validtrack == 0:
+			self.track = 'N/A'
+		self.speed = message.get('speed')
+		self.messages = message.get('messages')
+		self.seen = message.get('seen')
+
+		# Every database lookup used to return a brand new string
+		self.aircraft_type = (aircraft_type + ' ').rstrip()
+
+
+def total_size(objects):
+	"""
+	Adds up the size of each object, its __dict__ (if it has one), and every value it references.
+	Objects that are shared (like interned strings and small ints) are only counted once.
+	"""
+
+	seen_ids = set()
+	total = 0
+
+	def add(obj):
+		if id(obj) not in seen_ids:
+			seen_ids.add(id(obj))
+			return sys.getsizeof(obj)
+		return 0
+
+	for obj in objects:
+		total += add(obj)
+
+		if hasattr(obj, '__dict__'):
+			total += add(obj.__dict__)
+			values = obj.__dict__.values()
+		else:
+			values = [getattr(obj, name) for name in obj.__slots__]
+
+		for value in values:
+			total += add(value)
+
+	return total
+
+
+messages = benchmark_data.make_messages(fleet_size)
+
+# A third of the aircraft don't have a valid position or track, like aircraft that are only sending altitude
+for message in messages[::3]:
+	message['validposition'] = 0
+	message['validtrack'] = 0
+
+legacy = [LegacyAircraft(message, aircraft_types[n % len(aircraft_types)]) for n, message in enumerate(messages)]
+legacy_size = total_size(legacy)
+del legacy
+
+slotted = [Aircraft(message, None, (aircraft_types[n % len(aircraft_types)] + ' ').rstrip()) for n, message in enumerate(messages)]
+slotted_size = total_size(slotted)
+
+print 'aircraft:            ' + str(fleet_size)
+print 'legacy (__dict__):   ' + str(legacy_size // 1024) + ' KB, ' + str(legacy_size // fleet_size) + ' bytes per aircraft'
+print 'slotted Aircraft:    ' + str(slotted_size // 1024) + ' KB, ' + str(slotted_size // fleet_size) + ' bytes per aircraft'
+print 'saved:               ' + ('%.0f' % (100.0 * (legacy_size - slotted_size) / legacy_size)) + '%'
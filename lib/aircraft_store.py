@@ -0,0 +1,211 @@
+import numpy
+"""
+This module contains a class that keeps the numeric fields of every tracked aircraft in NumPy arrays
+(one array per field, one row per aircraft) so that operations on the whole fleet, like projecting
+positions onto the radar screen or filtering by distance, can be done with single vectorized calls
+instead of looping through Aircraft objects.
+
+Rows are found by hex code through a dictionary.  When an aircraft is removed its row is marked
+inactive and reused by the next new aircraft, so the arrays only grow when the fleet does.
+"""
+
+class AircraftStore:
+
+	def __init__(self, capacity=256):
+		"""
+		Constructor to create a new, empty AircraftStore object.
+
+		Parameters:
+			1 - number of rows to allocate to start with (optional), doubled whenever more are needed
+		"""
+
+		self.capacity = 0
+
+		# One array per field, all the same length (the capacity)
+		self.lat = numpy.zeros(0)
+		self.lon = numpy.zeros(0)
+		self.altitude = numpy.zeros(0)
+		self.speed = numpy.zeros(0)
+		self.track = numpy.zeros(0)
+		self.seen = numpy.zeros(0)
+		self.validposition = numpy.zeros(0, dtype=bool)
+		self.validtrack = numpy.zeros(0, dtype=bool)
+		self.active = numpy.zeros(0, dtype=bool)  # False for rows that aren't holding an aircraft
+
+		# Hex code held by each row (None for unused rows)
+		self.hex_codes = numpy.empty(0, dtype=object)
+
+		# Row of each aircraft, keyed by hex code
+		self.rows = {}
+
+		# Rows freed by removed aircraft, reused before the arrays are grown
+		self.free_rows = []
+
+		# Number of rows that have ever been used, rows at or past this have never held an aircraft
+		self.size = 0
+
+		self.grow(capacity)
+
+
+	def grow(self, capacity):
+		"""
+		Makes the arrays longer, keeping the existing rows.
+
+		Parameters:
+			1 - the new number of rows
+		"""
+
+		extra = capacity - self.capacity
+
+		if extra <= 0:
+			return
+
+		self.lat = numpy.concatenate((self.lat, numpy.zeros(extra)))
+		self.lon = numpy.concatenate((self.lon, numpy.zeros(extra)))
+		self.altitude = numpy.concatenate((self.altitude, numpy.zeros(extra)))
+		self.speed = numpy.concatenate((self.speed, numpy.zeros(extra)))
+		self.track = numpy.concatenate((self.track, numpy.zeros(extra)))
+		self.seen = numpy.concatenate((self.seen, numpy.zeros(extra)))
+		self.validposition = numpy.concatenate((self.validposition, numpy.zeros(extra, dtype=bool)))
+		self.validtrack = numpy.concatenate((self.validtrack, numpy.zeros(extra, dtype=bool)))
+		self.active = numpy.concatenate((self.active, numpy.zeros(extra, dtype=bool)))
+		self.hex_codes = numpy.concatenate((self.hex_codes, numpy.empty(extra, dtype=object)))
+
+		self.capacity = capacity
+
+
+	def update(self, aircraft):
+		"""
+		Copies an Aircraft object's numeric fields into its row, giving it a row first if it doesn't have one.
+
+		Parameters:
+			1 - the Aircraft object
+		"""
+
+		row = self.rows.get(aircraft.hex_code)
+
+		if row is None:
+			if len(self.free_rows) > 0:
+				row = self.free_rows.pop()
+			else:
+				if self.size == self.capacity:
+					self.grow(max(1, self.capacity * 2))
+				row = self.size
+				self.size += 1
+
+			self.rows[aircraft.hex_code] = row
+			self.hex_codes[row] = aircraft.hex_code
+			self.active[row] = True
+
+		self.lat[row] = aircraft.lat
+		self.lon[row] = aircraft.lon
+		self.validposition[row] = aircraft.validposition == 1
+		self.track[row] = aircraft.track
+		self.validtrack[row] = aircraft.validtrack == 1
+
+		# Missing values are stored as NaN so they never pass a comparison
+		self.altitude[row] = numpy.nan if aircraft.altitude is None else aircraft.altitude
+		self.speed[row] = numpy.nan if aircraft.speed is None else aircraft.speed
+		self.seen[row] = numpy.nan if aircraft.seen is None else aircraft.seen
+
+
+	def remove(self, hex_code):
+		"""
+		Frees the row of an aircraft so it can be reused.
+
+		Parameters:
+			1 - the hex code of the aircraft
+		"""
+
+		row = self.rows.pop(hex_code, None)
+
+		if row is not None:
+			self.active[row] = False
+			self.validposition[row] = False
+			self.validtrack[row] = False
+			self.hex_codes[row] = None
+			self.free_rows.append(row)
+
+
+	def clear(self):
+		"""
+		Removes every aircraft, keeping the allocated arrays.
+		"""
+
+		self.active[:] = False
+		self.validposition[:] = False
+		self.validtrack[:] = False
+		self.hex_codes[:] = None
+		self.rows.clear()
+		self.free_rows = []
+		self.size = 0
+
+
+	def apply_changes(self, changes, aircraft_table):
+		"""
+		Brings the store up to date with a Tracker's Changeset after a poll.  Removals are
+		applied first, since an aircraft can be removed and created again in the same poll.
+
+		Parameters:
+			1 - the Tracker's Changeset
+			2 - the Tracker's aircraft table (hex code to Aircraft object)
+		"""
+
+		for hex_code in changes.removed:
+			self.remove(hex_code)
+
+		for hex_code in changes.created + changes.updated:
+			aircraft = aircraft_table.get(hex_code)
+			if aircraft is not None:
+				self.update(aircraft)
+
+
+	def position_mask(self):
+		"""
+		Returns a boolean array that is True for every row holding an aircraft with a valid position.
+		"""
+
+		return self.active & self.validposition
+
+
+	def positions(self):
+		"""
+		Returns the hex codes, latitudes, and longitudes of every aircraft with a valid position as three arrays.
+		"""
+
+		mask = self.position_mask()
+
+		return self.hex_codes[mask], self.lat[mask], self.lon[mask]
+
+
+	def get_positions(self, hex_codes):
+		"""
+		Copies the positions of some aircraft out of the store, in the order their hex codes are given.
+
+		Parameters:
+			1 - list of hex codes
+
+		Returns:
+			Arrays of latitudes, longitudes, and whether each aircraft has a valid position
+			(False for hex codes that aren't in the store)
+		"""
+
+		count = len(hex_codes)
+
+		rows = numpy.fromiter((self.rows.get(hex_code, -1) for hex_code in hex_codes), dtype=int, count=count)
+		found = rows >= 0
+		rows = rows[found]
+
+		lats = numpy.zeros(count)
+		lons = numpy.zeros(count)
+		valid = numpy.zeros(count, dtype=bool)
+
+		lats[found] = self.lat[rows]
+		lons[found] = self.lon[rows]
+		valid[found] = self.validposition[rows]
+
+		return lats, lons, valid
+
+
+	def __len__(self):
+		return len(self.rows)
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import tempfile
+"""
+This module contains functions that generate fake transponder messages and a small FAA
+database so that the benchmark scripts can be run without a receiver or the real FAA files.
+"""
+
+def make_messages(fleet_size, poll=0, seen=1):
+	"""
+	Creates a list of transponder messages in the same format as dump1090's data.json.
+
+	Parameters:
+		1 - number of aircraft to create messages for
+		2 - poll number (optional), used to make the messages counter and position change between polls
+		3 - value for the "seen" element of every message (optional)
+
+	Returns:
+		List of messages as dictionaries
+	"""
+
+	messages = []
+
+	for n in range(fleet_size):
+		messages.append({
+			'hex': '%06x' % (0xA00000 + n),
+			'squawk': '1200',
+			'flight': 'TST%04d ' % n,
+			'lat': 30.0 + (n % 100) * 0.01 + poll * 0.0001,
+			'lon': -90.0 - (n // 100) * 0.01,
+			'validposition': 1,
+			'altitude': 1000 + n * 10,
+			'vert_rate': 0,
+			'track': n % 360,
+			'validtrack': 1,
+			'speed': 250,
+			'messages': 10 + poll,
+			'seen': seen
+		})
+
+	return messages
+
+
+def make_database(fleet_size=0):
+	"""
+	Creates a temporary SQLite database with the faa_master and faa_acftref tables used by
+	the aircraft_lookup module.  Half of the fake aircraft are registered so both found and
+	not found lookups are exercised.
+
+	Parameters:
+		1 - number of fake aircraft to register (optional)
+
+	Returns:
+		The file path of the temporary database (the caller should delete it when finished)
+	"""
+
+	handle, database = tempfile.mkstemp(suffix='.db')
+	os.close(handle)
+
+	con = sqlite3.connect(database)
+	con.execute('CREATE TABLE faa_master(n_number TEXT, mode_s_code_hex TEXT, name TEXT, mfr_mdl_code TEXT)')
+	con.execute('CREATE TABLE faa_acftref(code TEXT, mfr TEXT, model TEXT, type_acft TEXT, no_eng TEXT)')
+
+	con.executemany('INSERT INTO faa_acftref VALUES(?,?,?,?,?)', [
+		('1000001', 'BOEING              ', '737-800             ', '5', '02'),
+		('1000002', 'AIRBUS              ', 'A319-132            ', '5', '02')
+	])
+
+	con.executemany('INSERT INTO faa_master VALUES(?,?,?,?)', [
+		(str(n).ljust(5), ('%06X' % (0xA00000 + n)).ljust(10), ('REGISTRANT %d' % n).ljust(50), '100000' + str(n % 2 + 1))
+		for n in range(0, fleet_size, 2)
+	])
+
+	con.commit()
+	con.close()
+
+	return database
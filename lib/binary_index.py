@@ -0,0 +1,214 @@
+import mmap
+import struct
+"""
+This module contains a lookup backend that reads the binary index file created by
+db/faa_index_export.py.  The file is memory mapped, so opening it costs almost nothing and
+only the pages that lookups touch are read from disk, and aircraft are found by binary
+searching the sorted records.  It has the same lookup functions as aircraft_lookup.LookupService,
+so aircraft_lookup uses it automatically when the database file path is a binary index.
+"""
+
+# First 8 bytes of a binary index file (must match db/database_setup.py)
+MAGIC = 'FAAIDX01'
+
+HEADER_SIZE = 16
+RECORD_SIZE = 11
+
+
+def is_binary_index(filename):
+	"""
+	Returns True if the file is a binary index (checks the first bytes of the file).
+
+	Parameters:
+		1 - file path
+	"""
+
+	try:
+		with open(filename, 'rb') as f:
+			return f.read(len(MAGIC)) == MAGIC
+
+	except IOError:
+		return False
+
+
+class BinaryIndex:
+
+	def __init__(self, filename):
+		"""
+		Constructor to create a new BinaryIndex object, which memory maps the index file.
+		The map is read-only, so one BinaryIndex can be used by any number of threads.
+
+		Parameters:
+			1 - file path of the binary index
+		"""
+
+		self.filename = filename
+
+		with open(filename, 'rb') as f:
+			self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		if self.data[:len(MAGIC)] != MAGIC:
+			raise ValueError(filename + ' is not a binary index file')
+
+		self.number_records, self.string_table_offset = struct.unpack_from('>II', self.data, len(MAGIC))
+
+
+	def find(self, mode_s_code_hex):
+		"""
+		Binary searches the records for a hex code.
+
+		Parameters:
+			1 - mode_s_code_hex
+
+		Returns:
+			Byte offset of the aircraft's record, or None if it's not in the index
+		"""
+
+		try:
+			key = int(mode_s_code_hex, 16)
+		except ValueError:
+			return None
+
+		if key < 0 or key > 0xFFFFFF:
+			return None
+
+		# Big-endian keys compare the same way as strings of bytes as they do as numbers
+		key = struct.pack('>I', key)[1:]
+
+		data = self.data
+		low = 0
+		high = self.number_records - 1
+
+		while low <= high:
+			middle = (low + high) // 2
+			offset = HEADER_SIZE + middle * RECORD_SIZE
+			middle_key = data[offset:offset + 3]
+
+			if middle_key < key:
+				low = middle + 1
+			elif middle_key > key:
+				high = middle - 1
+			else:
+				return offset
+
+		return None
+
+
+	def get_string(self, offset):
+		"""
+		Returns the string stored at an offset in the string table.
+
+		Parameters:
+			1 - offset from the start of the string table
+		"""
+
+		start = self.string_table_offset + offset
+		length = ord(self.data[start])
+
+		return self.data[start + 1:start + 1 + length]
+
+
+	def get_aircraft_type(self, mode_s_code_hex):
+		"""
+		Looks up an aircraft's type.  Example: 747-47UF or A319-132
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			The aircraft's type, or MODEL? if it's not in the index
+		"""
+
+		offset = self.find(mode_s_code_hex)
+
+		if offset is None:
+			return 'MODEL?'
+
+		model = self.get_string(struct.unpack_from('>I', self.data, offset + 3)[0])
+
+		if len(model) == 0:
+			return 'MODEL?'
+
+		return model
+
+
+	def get_aircraft_registrant(self, mode_s_code_hex):
+		"""
+		Looks up an aircraft's registrant's name.  Example: FEDERAL EXPRESS CORP
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			The aircraft's registrant, or REG? if it's not in the index
+		"""
+
+		offset = self.find(mode_s_code_hex)
+
+		if offset is None:
+			return 'REG?'
+
+		registrant = self.get_string(struct.unpack_from('>I', self.data, offset + 7)[0])
+
+		if len(registrant) == 0:
+			return 'REG?'
+
+		return registrant
+
+
+	def get_aircraft_profile(self, mode_s_code_hex):
+		"""
+		Looks up what the index knows about an aircraft.  The index only stores the model
+		and registrant, so the other fields of the profile are None.
+
+		Parameters:
+			1 - mode_s_code_hex (must be all uppercase string)
+
+		Returns:
+			Dictionary in the same format as aircraft_lookup.get_aircraft_profile(), or None if it's not in the index
+		"""
+
+		offset = self.find(mode_s_code_hex)
+
+		if offset is None:
+			return None
+
+		model_offset, registrant_offset = struct.unpack_from('>II', self.data, offset + 3)
+
+		# Blank strings are None, like aircraft_lookup.get_aircraft_profile() returns them
+		return {
+			'hex': mode_s_code_hex,
+			'registration': None,
+			'registrant': self.get_string(registrant_offset) or None,
+			'manufacturer': None,
+			'model': self.get_string(model_offset) or None,
+			'type_aircraft': None,
+			'engine_count': None
+		}
+
+
+	def get_aircraft_types(self, hex_codes):
+		"""
+		Looks up the types of several aircraft.
+
+		Parameters:
+			1 - list of mode_s_code_hex codes (must be all uppercase strings)
+
+		Returns:
+			Dictionary of aircraft types keyed by hex code
+		"""
+
+		aircraft_types = {}
+
+		for mode_s_code_hex in hex_codes:
+			aircraft_types[mode_s_code_hex] = self.get_aircraft_type(mode_s_code_hex)
+
+		return aircraft_types
+
+
+	def close(self):
+		"""
+		Unmaps the index file.
+		"""
+
+		self.data.close()
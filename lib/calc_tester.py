@@ -1,4 +1,5 @@
 import calculations
+import time
 
 lat2 = 30.033706
 lon2 = -90.053415
@@ -15,3 +16,48 @@ print 'distance between points 1 & 2: ' + str(round(distance)) + ' ' + unit
 print 'bearing of point 2: ' + str(round(bearing))
 
 
+
+# Compare the closed-form get_scale() with the original get_scale_iterative() at several
+# latitudes and ranges (the GUI's range options), in both units
+latitudes = [0.0, 30.413940, 45.0, 60.0, 70.0, -33.9]
+ranges = [5, 10, 20, 30, 60, 120]
+
+max_difference = 0.0
+iterative_time = 0.0
+closed_form_time = 0.0
+
+for test_unit in ['miles', 'km']:
+	for test_lat in latitudes:
+		for test_range in ranges:
+			for var in ['lat', 'lon']:
+				start = time.time()
+				iterative = calculations.get_scale_iterative(test_lat, lon1, var, test_range, test_unit)
+				iterative_time += time.time() - start
+
+				calculations.scale_cache.clear()  # time the calculation, not the cache
+
+				start = time.time()
+				closed_form = calculations.get_scale(test_lat, lon1, var, test_range, test_unit)
+				closed_form_time += time.time() - start
+
+				max_difference = max(max_difference, abs(iterative - closed_form))
+
+				# The iterative search stops within 0.0001 units of the distance, so allow for that
+				assert abs(iterative - closed_form) <= 0.00001, 'get_scale mismatch: ' + str((test_lat, var, test_range, test_unit, iterative, closed_form))
+
+scale_tests = len(latitudes) * len(ranges) * 4
+
+print 'get_scale tests: ' + str(scale_tests) + ', max difference from get_scale_iterative: ' + ('%.7f' % max_difference) + ' degrees'
+print 'get_scale_iterative: ' + ('%.3f' % (iterative_time * 1000 / scale_tests)) + ' ms per call'
+print 'get_scale: ' + ('%.4f' % (closed_form_time * 1000 / scale_tests)) + ' ms per call'
+
+# An unknown unit or var is an error instead of a message
+for bad_unit, bad_var in [('furlongs', 'lat'), ('miles', 'alt')]:
+	try:
+		calculations.get_scale(lat1, lon1, bad_var, 10, bad_unit)
+	except ValueError:
+		pass
+	else:
+		raise AssertionError('get_scale accepted ' + str((bad_var, bad_unit)))
+
+print 'all get_scale tests passed'
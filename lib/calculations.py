@@ -1,9 +1,15 @@
-from math import radians, sin, cos, sqrt, atan2, degrees
+from math import radians, sin, cos, sqrt, atan2, asin, degrees
 import decimal
 """
 This module contains functions to perform calculations on latitude and longitude coordinates.
 """
 
+# Results of get_scale(), keyed by its parameters
+scale_cache = {}
+
+# Max number of results kept in scale_cache (it's cleared when it's full)
+scale_cache_size = 1024
+
 def get_distance(lat1, lon1, lat2, lon2, unit='miles'):
 	"""
 	Calculate the distance between two points on Earth given their latitude and
@@ -82,6 +88,71 @@ def get_bearing(lat1, lon1, lat2, lon2):
 
 
 def get_scale(lat1, lon1, var, desired_distance, unit='miles'):
+	"""
+	Calculate the difference in either latitude or longitude that is equivalent
+	to some desired distance at a given point on Earth, like get_scale_iterative(),
+	but solved directly by inverting the haversine formula used by get_distance()
+	instead of searching for the answer one decimal place at a time.  Results are
+	cached by their parameters.  (The GUI no longer uses a flat lat/lon scale, it draws
+	with projection.Projection instead.)
+
+	Moving along a meridian, the angle at Earth's center is just the distance divided by
+	Earth's radius.  Moving along a parallel, the haversine formula reduces to
+	distance / radius = 2 * asin(cos(lat) * sin(dif_lon / 2)), which is solved for dif_lon.
+
+	Parameters:
+		1 - latitude of position in decimal degrees
+		2 - longitude of position in decimal degrees
+		3 - "lat" or "lon" to specify if calulating change for latitude or longitude
+		4 - the desired distance from the given point
+		5 - unit of measure (optional), "miles" or "km", default is miles
+
+	Returns:
+		The difference in latitude or longitude
+
+	Raises ValueError if the unit or var isn't recognized
+	"""
+
+	key = (lat1, lon1, var, desired_distance, unit)
+
+	if key in scale_cache:
+		return scale_cache[key]
+
+	if unit == 'miles':
+		earth_radius = 3959  # radius in miles
+
+	elif unit == 'km':
+		earth_radius = 6371  # radius in kilometers
+
+	else:
+		raise ValueError('unknown units: ' + str(unit))
+
+	# Angle at Earth's center between the two points, in radians
+	angle = float(desired_distance) / earth_radius
+
+	if var == 'lat':
+		scale = degrees(angle)
+
+	elif var == 'lon':
+		# Near the poles a parallel can be shorter than the desired distance, so limit it to halfway around
+		x = sin(angle / 2) / cos(radians(lat1))
+		scale = degrees(2 * asin(min(abs(x), 1.0)))
+
+	else:
+		raise ValueError('value not recognized: ' + str(var))
+
+	# Rounded to 6 decimal places like get_scale_iterative()
+	scale = abs(round(scale, 6))
+
+	if len(scale_cache) >= scale_cache_size:
+		scale_cache.clear()
+
+	scale_cache[key] = scale
+
+	return scale
+
+
+def get_scale_iterative(lat1, lon1, var, desired_distance, unit='miles'):
 	"""
 	Calculate the difference in either latitude or longitude that is equivalent
 	to some desired distance at a given point on Earth.  For example, at a specific 
@@ -91,6 +162,9 @@ def get_scale(lat1, lon1, var, desired_distance, unit='miles'):
 	latitude and longitude coordinates to pixel coordinates in order to plot a point
 	on the screen.
 
+	This is the original version of get_scale(), which finds the answer by moving a second point
+	away one decimal place at a time and checking the distance, and is kept for comparison.
+
 	Parameters:
 		1 - latitude of position in decimal degrees
 		2 - longitude of position in decimal degrees
@@ -0,0 +1,121 @@
+import threading
+import traceback
+import Queue
+import aircraft_lookup
+"""
+This module contains a class that looks up aircraft types on a pool of worker threads so that
+creating an Aircraft never has to wait for the database.  New aircraft start out with a placeholder
+type and the real type is filled in by the Tracker once a worker has found it.  If a lookup fails,
+the error is printed and the Tracker requests the aircraft again on its next poll.
+"""
+
+# Type given to an aircraft while its real type is being looked up
+PENDING_TYPE = 'PENDING'
+
+
+class Enricher:
+
+	def __init__(self, database, workers=2, batch_size=500):
+		"""
+		Constructor to create a new Enricher object and start its worker threads.
+
+		Parameters:
+			1 - FAA database file path
+			2 - number of worker threads (optional)
+			3 - max number of hex codes a worker looks up in one batch (optional)
+		"""
+
+		self.database = database
+		self.batch_size = batch_size
+
+		# Hex codes waiting to be looked up, and (hex code, type) results waiting to be picked up
+		self.requests = Queue.Queue()
+		self.results = Queue.Queue()
+
+		# Hex codes that have been requested but don't have a result yet, so that an aircraft
+		# that shows up again before its lookup is finished isn't looked up twice
+		self.in_flight = set()
+		self.in_flight_lock = threading.Lock()
+
+		self.number_requested = 0
+		self.number_resolved = 0
+
+		self.workers = []
+		for n in range(workers):
+			worker = threading.Thread(target=self.work)
+			worker.daemon = True
+			worker.start()
+			self.workers.append(worker)
+
+
+	def request(self, hex_codes):
+		"""
+		Queues hex codes to be looked up.  Hex codes that are already being looked up are skipped.
+
+		Parameters:
+			1 - list (or set) of hex codes (must be all uppercase strings)
+		"""
+
+		with self.in_flight_lock:
+			for hex_code in hex_codes:
+				if hex_code not in self.in_flight:
+					self.in_flight.add(hex_code)
+					self.requests.put(hex_code)
+					self.number_requested += 1
+
+
+	def get_results(self):
+		"""
+		Picks up every result that is ready, without waiting for any that aren't.
+
+		Returns:
+			Dictionary of aircraft types keyed by hex code
+		"""
+
+		results = {}
+
+		while True:
+			try:
+				hex_code, aircraft_type = self.results.get_nowait()
+			except Queue.Empty:
+				break
+
+			results[hex_code] = aircraft_type
+
+		return results
+
+
+	def work(self):
+		"""
+		Loop that runs on each worker thread: waits for a request, takes any others that are
+		already queued (up to the batch size), and looks them all up together.
+		"""
+
+		while True:
+			hex_codes = [self.requests.get()]
+
+			while len(hex_codes) < self.batch_size:
+				try:
+					hex_codes.append(self.requests.get_nowait())
+				except Queue.Empty:
+					break
+
+			try:
+				aircraft_types = aircraft_lookup.get_aircraft_types(self.database, hex_codes)
+
+			# Don't let a database error kill the worker, print it and give no results for the batch
+			# (the aircraft keep the placeholder and the Tracker requests them again on its next poll)
+			except Exception:
+				print 'aircraft type lookup failed for ' + str(len(hex_codes)) + ' aircraft:'
+				traceback.print_exc()
+				aircraft_types = {}
+
+			for hex_code in hex_codes:
+				if hex_code in aircraft_types:
+					self.results.put((hex_code, aircraft_types[hex_code]))
+
+			with self.in_flight_lock:
+				for hex_code in hex_codes:
+					self.in_flight.discard(hex_code)
+
+				self.number_resolved += len(aircraft_types)
@@ -0,0 +1,118 @@
+import os
+import sys
+import sqlite3
+import time
+import benchmark_data
+import aircraft_lookup
+import binary_index
+
+sys.path.append(os.path.join('..', 'db'))
+import database_setup
+"""
+Compares the time per lookup of opening a new connection for every lookup (the way aircraft_lookup
+used to work) with the LookupService's long-lived connection, first with the LIKE prefix scan and then
+with the indexed hex_key column.  Full aircraft profiles are then timed with the master/acftref join and
+with the denormalized aircraft_profile table.  The caches are skipped so that every lookup goes to the database.
+Run from the lib directory: python lookup_benchmark.py
+"""
+
+registered_aircraft = 50000
+lookups = 500
+
+
+def legacy_get_aircraft_type(database, mode_s_code_hex):
+	# Connection opened for each lookup and the hex code pasted into the SQL
+	conn = sqlite3.connect(database)
+
+	select_statement = (
+		'SELECT '
+			'IFNULL(faa_acftref.model, "MODEL?") '
+		'FROM faa_master '
+			'LEFT OUTER JOIN faa_acftref ON faa_master.mfr_mdl_code = faa_acftref.code '
+		'WHERE faa_master.mode_s_code_hex LIKE "' + mode_s_code_hex + '%";')
+
+	result = conn.execute(select_statement).fetchone()
+
+	conn.close()
+
+	if result is not None:
+		return str(result[0]).rstrip()
+
+	return 'MODEL?'
+
+
+database = benchmark_data.make_database(registered_aircraft * 2)
+
+# Spread the lookups over the whole table, half of them for hex codes that aren't registered
+hex_codes = ['%06X' % (0xA00000 + n * (registered_aircraft * 2 // lookups)) for n in range(lookups)]
+hex_codes = [hex_code if n % 2 == 0 else hex_code[:-1] + 'Z' for n, hex_code in enumerate(hex_codes)]
+
+start = time.time()
+legacy_results = [legacy_get_aircraft_type(database, hex_code) for hex_code in hex_codes]
+legacy_time = time.time() - start
+
+service = aircraft_lookup.LookupService(database)
+service.get_aircraft_type(hex_codes[0])  # open the connection before timing
+
+start = time.time()
+service_results = [service.get_aircraft_type(hex_code) for hex_code in hex_codes]
+service_time = time.time() - start
+
+service.close()
+
+# Add the hex_key column and time the exact match lookups
+database_setup.add_hex_key(database)
+
+indexed_service = aircraft_lookup.LookupService(database)
+indexed_service.get_aircraft_type(hex_codes[0])
+
+start = time.time()
+indexed_results = [indexed_service.get_aircraft_type(hex_code) for hex_code in hex_codes]
+indexed_time = time.time() - start
+
+# Time full profile lookups with the join, then with the aircraft_profile table
+start = time.time()
+joined_profiles = [indexed_service.get_aircraft_profile(hex_code) for hex_code in hex_codes]
+joined_profile_time = time.time() - start
+
+indexed_service.close()
+
+database_setup.create_aircraft_profile(database)
+
+profile_service = aircraft_lookup.LookupService(database)
+profile_service.get_aircraft_profile(hex_codes[0])
+
+start = time.time()
+table_profiles = [profile_service.get_aircraft_profile(hex_code) for hex_code in hex_codes]
+table_profile_time = time.time() - start
+
+profile_service.close()
+
+# Export a binary index and time the memory mapped lookups
+index_file = database + '.idx'
+database_setup.export_binary_index(database, index_file)
+
+start = time.time()
+index = binary_index.BinaryIndex(index_file)
+open_time = time.time() - start
+
+start = time.time()
+binary_results = [index.get_aircraft_type(hex_code) for hex_code in hex_codes]
+binary_time = time.time() - start
+
+index.close()
+
+print 'registered aircraft:       ' + str(registered_aircraft)
+print 'lookups:                   ' + str(lookups)
+print 'connection per lookup:     ' + ('%.3f' % (legacy_time * 1000 / lookups)) + ' ms per lookup'
+print 'LookupService (LIKE):      ' + ('%.3f' % (service_time * 1000 / lookups)) + ' ms per lookup'
+print 'LookupService (hex_key):   ' + ('%.3f' % (indexed_time * 1000 / lookups)) + ' ms per lookup'
+print 'profile (join):            ' + ('%.3f' % (joined_profile_time * 1000 / lookups)) + ' ms per lookup'
+print 'profile (table):           ' + ('%.3f' % (table_profile_time * 1000 / lookups)) + ' ms per lookup'
+print 'BinaryIndex (mmap):        ' + ('%.3f' % (binary_time * 1000 / lookups)) + ' ms per lookup, ' + ('%.3f' % (open_time * 1000)) + ' ms to open'
+print 'binary index size:         ' + str(os.path.getsize(index_file) // 1024) + ' KB (database ' + str(os.path.getsize(database) // 1024) + ' KB)'
+print 'same results:              ' + str(legacy_results == service_results == indexed_results == binary_results and joined_profiles == table_profiles)
+
+os.remove(index_file)
+
+os.remove(database)
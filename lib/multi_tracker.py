@@ -0,0 +1,192 @@
+import requests
+import datetime
+import time
+from multiprocessing.pool import ThreadPool
+from collections import OrderedDict
+from tracker import *
+"""
+This module contains a Tracker that polls several receivers at the same time and merges
+their messages into one set of tracked aircraft.  When more than one receiver hears the same
+aircraft, the message with the lowest "seen" (the freshest one) is kept.
+"""
+
+class SourceStats:
+
+	def __init__(self, url):
+		"""
+		Constructor to create a new SourceStats object, which keeps track of how one receiver is responding.
+
+		Parameters:
+			1 - the receiver's URL
+		"""
+
+		self.url = url
+		self.number_polls = 0
+		self.number_errors = 0
+		self.number_messages_received = 0
+		self.connection_error = False
+		self.last_error = None  # string description of the most recent error
+		self.last_latency = None  # seconds taken by the most recent poll
+		self.total_latency = 0
+
+
+	def average_latency(self):
+		"""
+		Returns the average number of seconds each poll of this receiver has taken, or None if it hasn't been polled.
+		"""
+
+		if self.number_polls == 0:
+			return None
+
+		return self.total_latency / self.number_polls
+
+
+class MultiSourceTracker(Tracker):
+
+	def __init__(self, database, timeout=None, max_workers=8):
+		"""
+		Constructor to create a new MultiSourceTracker object.
+
+		Parameters:
+			1 - FAA database file path (used when creating Aircraft objects)
+			2 - number of seconds to wait for each receiver before giving up (optional), default is to wait forever
+			3 - max number of receivers to poll at the same time (optional)
+		"""
+
+		Tracker.__init__(self, database, timeout)
+
+		self.pool = ThreadPool(max_workers)
+
+		# Each receiver gets its own polling client (and kept-alive connection), keyed by URL
+		self.clients = {}
+
+		# Last messages received from each receiver, reused when a receiver says nothing has changed
+		self.last_messages = {}
+
+		# SourceStats for each receiver being polled, keyed by URL
+		self.source_stats = OrderedDict()
+
+
+	def get_flights(self, urls):
+		"""
+		Polls every receiver at the same time, merges their messages, and updates the tracked aircraft.
+		A poll takes about as long as the slowest receiver.  connection_error is only set if none of the
+		receivers could be reached; errors for each receiver are recorded in source_stats.
+
+		Parameters:
+			1 - list of URLs to connect with (in the format http://[IP address]:8080/data.json),
+			    a single URL string also works
+		"""
+
+		if isinstance(urls, basestring):
+			urls = [urls]
+
+		self.current_time = datetime.datetime.now().time()
+
+		# Set up clients and stats for new receivers, and stop keeping stats for receivers that were dropped
+		source_stats = OrderedDict()
+		for url in urls:
+			if url not in self.clients:
+				self.clients[url] = PollingClient(self.timeout)
+			if url in self.source_stats:
+				source_stats[url] = self.source_stats[url]
+			else:
+				source_stats[url] = SourceStats(url)
+
+		for url in self.clients.keys():
+			if url not in source_stats:
+				self.clients.pop(url).close()
+				self.last_messages.pop(url, None)
+
+		self.source_stats = source_stats
+
+		message_lists = self.pool.map(self.poll_source, urls)
+
+		self.connection_error = len(urls) > 0 and all(stats.connection_error for stats in self.source_stats.values())
+
+		self.process_messages(self.merge_messages(message_lists))
+
+
+	def poll_source(self, url):
+		"""
+		Polls one receiver and records its latency and errors.  Runs on one of the pool's threads.
+
+		Parameters:
+			1 - the receiver's URL
+
+		Returns:
+			List of messages from the receiver (empty if there was an error), so one receiver
+			that fails doesn't stop the others' messages from being merged
+		"""
+
+		stats = self.source_stats[url]
+		start = time.time()
+
+		try:
+			json_data = self.clients[url].get_json(url)
+
+			if json_data is None:
+				json_data = self.last_messages.get(url, [])
+
+			self.last_messages[url] = json_data
+			stats.connection_error = False
+
+		except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as error:
+			json_data = []
+			stats.connection_error = True
+			stats.number_errors += 1
+			stats.last_error = str(error)
+
+		# The receiver responded, but not with valid data.json (like a truncated body),
+		# or something else went wrong with this receiver
+		except Exception as error:
+			json_data = []
+			stats.connection_error = False
+			stats.number_errors += 1
+			stats.last_error = type(error).__name__ + ': ' + str(error)
+
+		stats.last_latency = time.time() - start
+		stats.total_latency += stats.last_latency
+		stats.number_polls += 1
+		stats.number_messages_received = len(json_data)
+
+		return json_data
+
+
+	def close(self):
+		"""
+		Stops the pool's threads and closes every receiver's connection.  The tracker can't poll after this.
+		"""
+
+		self.pool.terminate()
+		self.pool.join()
+
+		for client in self.clients.values():
+			client.close()
+
+		self.clients.clear()
+
+
+	def merge_messages(self, message_lists):
+		"""
+		Merges the messages from several receivers into one message per aircraft,
+		keeping the message with the lowest "seen" for each hex code.
+
+		Parameters:
+			1 - list of message lists, one from each receiver
+
+		Returns:
+			List of merged messages
+		"""
+
+		merged = {}
+
+		for messages in message_lists:
+			for message in messages:
+				hex_code = str(message.get('hex')).upper()
+				current = merged.get(hex_code)
+
+				if current is None or message.get('seen') < current.get('seen'):
+					merged[hex_code] = message
+
+		return merged.values()
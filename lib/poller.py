@@ -0,0 +1,198 @@
+import threading
+import time
+import copy
+import traceback
+from collections import namedtuple
+"""
+This module contains a class that runs a Tracker on its own thread so that slow network
+requests or database lookups don't block the GUI.  After every poll the Poller publishes an
+immutable Snapshot of the tracker's state, which the GUI can read at any time without waiting.
+"""
+
+# Read-only copy of a Tracker's state at the end of one poll
+Snapshot = namedtuple('Snapshot', [
+	'aircraft_list',  # tuple of copies of the Aircraft objects being tracked
+	'current_time',  # time when the tracker last updated
+	'connection_error',  # True if the last poll couldn't reach the receiver
+	'number_messages_received',
+	'number_created',
+	'number_updated',
+	'number_removed',
+	'number_expired',
+	'changes',  # the tracker's Changeset for the last poll
+	'error',  # message of the error that made the last poll fail (other than a connection error), or None
+	'positions'  # (lats, lons, valid) arrays in aircraft_list order copied from the tracker's AircraftStore, or None
+])
+
+
+def make_snapshot(tracker, copy_aircraft=True, previous=None):
+	"""
+	Creates a Snapshot of a Tracker's current state.
+
+	Parameters:
+		1 - the Tracker object
+		2 - True to copy each Aircraft object (optional), only pass False if the tracker
+		    isn't going to be updated while the snapshot is being used
+		3 - the Snapshot taken after the tracker's previous poll (optional), copies of aircraft that
+		    weren't created or updated by the last poll are reused from it instead of copied again
+
+	Returns:
+		A Snapshot namedtuple
+	"""
+
+	if copy_aircraft:
+		# Copies in the previous snapshot are never modified, so unchanged aircraft can share them
+		previous_copies = {}
+		if previous is not None:
+			for aircraft in previous.aircraft_list:
+				previous_copies[aircraft.hex_code] = aircraft
+
+		changed = set(tracker.changes.created)
+		changed.update(tracker.changes.updated)
+
+		aircraft_list = []
+		for aircraft in tracker.aircraft_list:
+			if aircraft.hex_code in changed or aircraft.hex_code not in previous_copies:
+				aircraft_list.append(copy.copy(aircraft))
+			else:
+				aircraft_list.append(previous_copies[aircraft.hex_code])
+
+		aircraft_list = tuple(aircraft_list)
+
+	else:
+		aircraft_list = tuple(tracker.aircraft_list)
+
+	# The store's arrays are changed by the next poll, so the positions are copied out of it
+	# (the aircraft table's keys are in the same order as the aircraft list)
+	positions = None
+	if tracker.store is not None:
+		positions = tracker.store.get_positions(tracker.aircraft_table.keys())
+
+	return Snapshot(
+		aircraft_list,
+		tracker.current_time,
+		tracker.connection_error,
+		tracker.number_messages_received,
+		tracker.number_created,
+		tracker.number_updated,
+		tracker.number_removed,
+		tracker.number_expired,
+		tracker.changes,
+		None,
+		positions
+	)
+
+
+class Poller:
+
+	def __init__(self, tracker, interval=0.5):
+		"""
+		Constructor to create a new Poller object.  The poller doesn't start polling until start() is called.
+
+		Parameters:
+			1 - the Tracker object to update (should only be used by this poller once it's started)
+			2 - number of seconds between the start of each poll (optional)
+		"""
+
+		self.tracker = tracker
+		self.interval = interval
+		self.url = None
+
+		# Latest published state, replaced (never modified) after every poll
+		self.snapshot = make_snapshot(tracker)
+
+		# Set from the GUI thread and handled by the polling thread before its next poll
+		self.clear_requested = False
+
+		# Only one thread can update the tracker at a time, which matters if the poller is stopped
+		# and started again while the old thread is still finishing a slow request
+		self.poll_lock = threading.Lock()
+
+		self.thread = None
+		self.stop_event = None
+
+
+	def start(self, url):
+		"""
+		Starts polling the URL on a background thread.  If the poller is already running,
+		only the URL is changed and it will be used for the next poll.
+
+		Parameters:
+			1 - the URL to poll (in the format http://[IP address]:8080/data.json),
+			    or a list of URLs if the tracker is a MultiSourceTracker
+		"""
+
+		self.url = url
+
+		if self.is_running():
+			return
+
+		# Don't let an error from a previous run stop the display as soon as polling is restarted
+		self.snapshot = self.snapshot._replace(connection_error=False)
+
+		# Each thread gets its own stop event so that stopping an old thread can't stop a new one
+		self.stop_event = threading.Event()
+		self.thread = threading.Thread(target=self.run, args=(self.stop_event,))
+		self.thread.daemon = True
+		self.thread.start()
+
+
+	def stop(self):
+		"""
+		Tells the polling thread to stop.  Doesn't wait for it, so a request that is in progress
+		finishes in the background and the GUI isn't blocked.
+		"""
+
+		if self.stop_event is not None:
+			self.stop_event.set()
+
+
+	def is_running(self):
+		"""
+		Returns True if polling has been started and not stopped.
+		"""
+
+		return self.stop_event is not None and not self.stop_event.is_set() and self.thread.is_alive()
+
+
+	def clear_list(self):
+		"""
+		Asks the polling thread to empty the tracker's aircraft list before its next poll.
+		The current snapshot is emptied right away so the GUI reflects the reset immediately.
+		"""
+
+		self.clear_requested = True
+		self.snapshot = self.snapshot._replace(aircraft_list=(), positions=None)
+
+
+	def run(self, stop_event):
+		"""
+		Polling loop that runs on the background thread until the stop event is set.
+
+		Parameters:
+			1 - threading.Event that signals this thread to stop
+		"""
+
+		while not stop_event.is_set():
+			start = time.time()
+
+			with self.poll_lock:
+				try:
+					if self.clear_requested:
+						self.clear_requested = False
+						self.tracker.clear_list()
+
+					self.tracker.get_flights(self.url)
+
+					# Replacing the reference is atomic, so the GUI always sees a complete snapshot
+					self.snapshot = make_snapshot(self.tracker, True, self.snapshot)
+
+				# Don't let a bad response or a database error kill the thread, print it, record it on
+				# the snapshot so the GUI can show it, and try again on the next poll
+				except Exception as error:
+					print 'poll failed:'
+					traceback.print_exc()
+					self.snapshot = self.snapshot._replace(error=(type(error).__name__ + ': ' + str(error)))
+
+			# Wait for the rest of the interval (or until stopped)
+			stop_event.wait(max(0, self.interval - (time.time() - start)))
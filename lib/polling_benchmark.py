@@ -0,0 +1,151 @@
+import BaseHTTPServer
+import threading
+import gzip
+import hashlib
+import json
+import time
+import requests
+from StringIO import StringIO
+import benchmark_data
+from polling_client import *
+"""
+Compares polling a local stub of dump1090's data.json with a bare requests.get() against the
+PollingClient.  The stub server supports keep-alive, gzip, and ETags, and only changes its data
+every few polls the way dump1090 rewrites data.json about once a second.
+Run from the lib directory: python polling_benchmark.py
+"""
+
+fleet_size = 300
+polls = 100
+polls_per_change = 2  # the data changes every other poll, like a 1 second file polled every 500 ms
+
+
+# Each version of the data is built once so the stub server's own work doesn't skew the timings
+versions = {}
+
+def get_version(version):
+	if version not in versions:
+		body = json.dumps(benchmark_data.make_messages(fleet_size, version))
+
+		buf = StringIO()
+		gzip_file = gzip.GzipFile(fileobj=buf, mode='wb')
+		gzip_file.write(body)
+		gzip_file.close()
+
+		versions[version] = (body, buf.getvalue(), '"' + hashlib.md5(body).hexdigest() + '"')
+
+	return versions[version]
+
+
+class StubServer(BaseHTTPServer.HTTPServer):
+
+	def __init__(self):
+		BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+		self.requests_handled = 0
+		self.connections = 0
+		self.bytes_sent = 0
+
+	def process_request(self, request, client_address):
+		self.connections += 1
+		BaseHTTPServer.HTTPServer.process_request(self, request, client_address)
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+	protocol_version = 'HTTP/1.1'  # needed for keep-alive
+
+	# Send the headers and body together, otherwise the small writes stall on delayed ACKs over a kept-alive connection
+	wbufsize = -1
+	disable_nagle_algorithm = True
+
+	def do_GET(self):
+		server = self.server
+		version = server.requests_handled // polls_per_change
+		server.requests_handled += 1
+
+		body, gzip_body, etag = get_version(version)
+
+		if self.headers.get('If-None-Match') == etag:
+			self.send_response(304)
+			self.send_header('ETag', etag)
+			self.send_header('Content-Length', '0')
+			self.end_headers()
+			return
+
+		if 'gzip' in self.headers.get('Accept-Encoding', ''):
+			body = gzip_body
+			encoding = 'gzip'
+		else:
+			encoding = None
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.send_header('ETag', etag)
+		if encoding is not None:
+			self.send_header('Content-Encoding', encoding)
+		self.end_headers()
+		self.wfile.write(body)
+
+		server.bytes_sent += len(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+def run_stub_server():
+	server = StubServer()
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+	return server
+
+
+def bare_poll(url):
+	# The way Tracker.get_flights() used to poll: new connection, uncompressed, text then json
+	start = time.time()
+	response = requests.get(url, headers={'Accept-Encoding': 'identity'})
+	json.loads(response.text)
+	return time.time() - start
+
+
+def client_poll(client, url):
+	start = time.time()
+	client.get_json(url)
+	return time.time() - start
+
+
+for version in range(polls // polls_per_change + 1):
+	get_version(version)
+
+for name in ['bare requests.get', 'PollingClient']:
+
+	server = run_stub_server()
+	url = 'http://127.0.0.1:' + str(server.server_port) + '/data.json'
+	client = PollingClient()
+
+	poll_time = 0
+	start = time.time()
+
+	# Both time the request and the parse together, since the client decodes while reading
+	for poll in range(polls):
+		if name == 'bare requests.get':
+			poll_time += bare_poll(url)
+		else:
+			poll_time += client_poll(client, url)
+
+	total_time = time.time() - start
+
+	client.close()
+	server.shutdown()
+	server.server_close()
+
+	print name
+	print '  connections opened:   ' + str(server.connections)
+	print '  body bytes per poll:  ' + str(server.bytes_sent // polls)
+	print '  time per poll (ms):   ' + ('%.2f' % (total_time * 1000 / polls))
+	print '  fetch + parse (ms):   ' + ('%.2f' % (poll_time * 1000 / polls))
+	if name == 'PollingClient':
+		print '  304 not modified:     ' + str(client.number_not_modified) + ' of ' + str(client.number_polls)
+		print '  wire bytes counted:   ' + str(client.bytes_received // polls) + ' per poll'
+	print
@@ -0,0 +1,92 @@
+import requests
+import json
+"""
+This module contains a class for polling a receiver's data.json over HTTP.  It reuses one
+pooled connection for every poll, asks for a compressed response, and sends the receiver's
+ETag/Last-Modified back so that an unchanged file costs a 304 response instead of a download.
+"""
+
+class PollingClient:
+
+	def __init__(self, timeout=None):
+		"""
+		Constructor to create a new PollingClient object.
+
+		Parameters:
+			1 - number of seconds to wait for the receiver before giving up (optional), default is to wait forever
+		"""
+
+		self.timeout = timeout
+
+		# The session keeps the TCP connection open between polls (keep-alive)
+		self.session = requests.Session()
+		self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+
+		# Validators from the last full response for each URL, sent back as conditional request headers
+		self.etags = {}
+		self.last_modified = {}
+
+		# Running totals that can be used to see how much the client is saving
+		self.number_polls = 0
+		self.number_not_modified = 0
+		self.bytes_received = 0
+
+
+	def get_json(self, url):
+		"""
+		Requests the URL and decodes the JSON in the response.
+
+		Parameters:
+			1 - the URL to connect with (in the format http://[IP address]:8080/data.json)
+
+		Returns:
+			The decoded JSON, or None if the receiver says nothing has changed since the last poll
+
+		Raises requests.HTTPError if the receiver responds with an error status (like 404 or 500)
+		"""
+
+		headers = {}
+
+		if url in self.etags:
+			headers['If-None-Match'] = self.etags[url]
+
+		if url in self.last_modified:
+			headers['If-Modified-Since'] = self.last_modified[url]
+
+		response = self.session.get(url, headers=headers, timeout=self.timeout)
+
+		self.number_polls += 1
+
+		# 304 Not Modified has no body, so there is nothing to parse
+		if response.status_code == 304:
+			self.number_not_modified += 1
+			return None
+
+		# Don't try to decode an error page as JSON
+		response.raise_for_status()
+
+		# Reading content gives the decompressed bytes, which json can decode without
+		# first being converted to text
+		content = response.content
+
+		# Count the bytes that actually came over the wire (compressed size if the response was compressed)
+		try:
+			self.bytes_received += response.raw.tell()
+		except AttributeError:
+			self.bytes_received += len(content)
+
+		if 'ETag' in response.headers:
+			self.etags[url] = response.headers['ETag']
+
+		if 'Last-Modified' in response.headers:
+			self.last_modified[url] = response.headers['Last-Modified']
+
+		return json.loads(content)
+
+
+	def close(self):
+		"""
+		Closes the pooled connection.
+		"""
+
+		self.session.close()
@@ -0,0 +1,148 @@
+import numpy
+import vector_calculations
+"""
+This module contains a class that converts between latitude/longitude and pixel coordinates on the
+radar screen with an azimuthal equidistant projection centered on the radar's center point, so that
+every aircraft is drawn at its true distance and bearing from the center (the range circles really
+are range circles), even at long range.  The trigonometry of the center point is worked out once when
+the projection is created, and whole arrays of positions are converted with single NumPy calls.
+
+https://en.wikipedia.org/wiki/Azimuthal_equidistant_projection
+http://mathworld.wolfram.com/AzimuthalEquidistantProjection.html
+"""
+
+class Projection:
+
+	def __init__(self, center_lat, center_lon, distance, unit='miles', radius_pixels=300, center_x=300, center_y=300):
+		"""
+		Constructor to create a new Projection object.
+
+		Parameters:
+			1 - latitude of the center point in decimal degrees
+			2 - longitude of the center point in decimal degrees
+			3 - distance from the center point to the edge of the radar screen (the range)
+			4 - unit of distance (optional), "miles" or "km", default is miles
+			5 - number of pixels from the center of the radar screen to the edge (optional)
+			6 - x pixel coordinate of the center point (optional)
+			7 - y pixel coordinate of the center point (optional)
+		"""
+
+		self.center_lat = center_lat
+		self.center_lon = center_lon
+		self.distance = distance
+		self.unit = unit
+		self.radius_pixels = radius_pixels
+		self.center_x = center_x
+		self.center_y = center_y
+
+		# Center point in radians and its sine and cosine, used for every conversion
+		self.lat0 = numpy.radians(center_lat)
+		self.lon0 = numpy.radians(center_lon)
+		self.sin_lat0 = numpy.sin(self.lat0)
+		self.cos_lat0 = numpy.cos(self.lat0)
+
+		# Pixels per radian of angle at Earth's center
+		self.pixels_per_radian = radius_pixels / (float(distance) / vector_calculations.get_earth_radius(unit))
+
+
+	def to_pixels(self, lats, lons):
+		"""
+		Converts positions to pixel coordinates on the radar screen.
+
+		Parameters:
+			1 - array of latitudes in decimal degrees
+			2 - array of longitudes in decimal degrees
+
+		Returns:
+			Arrays of the x and y pixel coordinates (y increases going down the screen, like a Canvas)
+		"""
+
+		lats = numpy.radians(numpy.asarray(lats, dtype=float))
+		dif_lons = numpy.radians(numpy.asarray(lons, dtype=float)) - self.lon0
+
+		sin_lats = numpy.sin(lats)
+		cos_lats = numpy.cos(lats)
+		cos_dif_lons = numpy.cos(dif_lons)
+
+		# Angle at Earth's center between the center point and each position
+		cos_c = numpy.clip(self.sin_lat0 * sin_lats + self.cos_lat0 * cos_lats * cos_dif_lons, -1.0, 1.0)
+		c = numpy.arccos(cos_c)
+
+		# Scale factor c / sin(c), which is 1 at the center point
+		sin_c = numpy.sin(c)
+		k = numpy.ones_like(c)
+		nonzero = sin_c > 1e-12
+		k[nonzero] = c[nonzero] / sin_c[nonzero]
+
+		x = k * cos_lats * numpy.sin(dif_lons)
+		y = k * (self.cos_lat0 * sin_lats - self.sin_lat0 * cos_lats * cos_dif_lons)
+
+		return self.center_x + x * self.pixels_per_radian, self.center_y - y * self.pixels_per_radian
+
+
+	def to_latlon(self, x, y):
+		"""
+		Converts pixel coordinates on the radar screen back to positions.
+
+		Parameters:
+			1 - x pixel coordinate (or array of them)
+			2 - y pixel coordinate (or array of them)
+
+		Returns:
+			The latitudes and longitudes in decimal degrees (arrays if arrays were passed)
+		"""
+
+		x = (numpy.asarray(x, dtype=float) - self.center_x) / self.pixels_per_radian
+		y = (self.center_y - numpy.asarray(y, dtype=float)) / self.pixels_per_radian
+
+		# Distance from the center on the screen is the angle at Earth's center
+		c = numpy.hypot(x, y)
+		sin_c = numpy.sin(c)
+		cos_c = numpy.cos(c)
+
+		# At the center point y * sin(c) / c is 0
+		with numpy.errstate(invalid='ignore', divide='ignore'):
+			y_sin_c = numpy.where(c > 0, y * sin_c / c, 0.0)
+
+		lats = numpy.arcsin(numpy.clip(cos_c * self.sin_lat0 + y_sin_c * self.cos_lat0, -1.0, 1.0))
+		lons = self.lon0 + numpy.arctan2(x * sin_c, c * self.cos_lat0 * cos_c - y * self.sin_lat0 * sin_c)
+
+		# Keep longitudes between -180 and 180
+		lons = (numpy.degrees(lons) + 180) % 360 - 180
+
+		return numpy.degrees(lats), lons
+
+
+	def hit_test(self, x, y, lats, lons, valid=None, tolerance_pixels=10):
+		"""
+		Finds the position closest to a point clicked on the radar screen.
+
+		Parameters:
+			1 - x pixel coordinate of the click
+			2 - y pixel coordinate of the click
+			3 - array of latitudes in decimal degrees
+			4 - array of longitudes in decimal degrees
+			5 - boolean array that is False for positions that aren't valid (optional)
+			6 - how close to the click (in pixels) a position has to be (optional)
+
+		Returns:
+			Index of the closest position in the arrays, or None if none are close enough
+		"""
+
+		if len(lats) == 0:
+			return None
+
+		click_lat, click_lon = self.to_latlon(x, y)
+
+		distances = vector_calculations.get_distances(float(click_lat), float(click_lon), lats, lons, self.unit, valid)
+
+		if numpy.isnan(distances).all():
+			return None
+
+		index = int(numpy.nanargmin(distances))
+
+		# Distance on Earth that the tolerance covers on the screen
+		if distances[index] > tolerance_pixels * float(self.distance) / self.radius_pixels:
+			return None
+
+		return index
@@ -1,8 +1,12 @@
 from Tkinter import *
 from tracker import *
+from multi_tracker import *
+from sbs_stream import *
+from poller import *
 import time
-import calculations
+import vector_calculations
 import radar_config
+from projection import Projection
 
 class GUI:
 
@@ -17,11 +21,12 @@ class GUI:
 		self.current_lon = radar_config.DEFAULT_LON
 
 		# IP address to ping in order to receive transponder messages
+		# (more than one receiver can be used by separating their IP addresses with commas)
 		self.ip_address = radar_config.DEFAULT_IP
 
-		# Variables that will hold the scale used to convert between lat/lon and pixel coordinates
-		self.lat_scale = None
-		self.lon_scale = None
+		# Projection used to convert between lat/lon and pixel coordinates on the radar screen
+		# (rebuilt whenever the center point, range, or unit of distance changes)
+		self.projection = None
 
 		self.unit_of_distance = radar_config.DEFAULT_UNIT_OF_DISTANCE
 
@@ -29,8 +34,42 @@ class GUI:
 		self.database = radar_config.DATABASE
 
 		# Create the Tracker object that parses transponder messages, maintains a list of aircraft being tracked
-		# and creates/updates data for each aircraft being tracked
-		self.tracker = Tracker(self.database)
+		# and creates/updates data for each aircraft being tracked, either by reading the receiver's SBS-1 stream
+		# or by polling every receiver's data.json at the same time
+		if radar_config.SBS_STREAMING:
+			self.tracker = StreamTracker(self.database, radar_config.REQUEST_TIMEOUT)
+		else:
+			self.tracker = MultiSourceTracker(self.database, radar_config.REQUEST_TIMEOUT)
+
+		# Look up the types of new aircraft on worker threads so new aircraft show up without waiting for the database
+		if radar_config.ASYNC_LOOKUPS:
+			self.tracker.enable_async_lookups()
+
+		# Keep the positions of the aircraft in NumPy arrays so each refresh doesn't have to collect them
+		# from every Aircraft object
+		if radar_config.AIRCRAFT_STORE:
+			self.tracker.enable_store()
+
+		# If background polling is turned on, the Poller runs the tracker on its own thread and the GUI
+		# only reads the snapshots it publishes, otherwise the tracker is updated on the GUI thread
+		if radar_config.BACKGROUND_POLLING:
+			self.poller = Poller(self.tracker, radar_config.POLL_INTERVAL)
+		else:
+			self.poller = None
+
+		# State of the tracker that is currently being displayed
+		self.snapshot = make_snapshot(self.tracker, False)
+
+		# Distance and bearing from the center point to each aircraft in the snapshot (same order as its aircraft list)
+		self.ranges = None
+		self.bearings = None
+
+		# Position of each aircraft in the snapshot and its pixel coordinates on the radar screen
+		self.lats = None
+		self.lons = None
+		self.valid = None
+		self.plot_x = None
+		self.plot_y = None
 
 		#########################################
 		# Create the main containers / displays #
@@ -52,6 +91,9 @@ class GUI:
 		self.radar_screen = Canvas(self.main_container, width=600, height=600, bg='black', highlightthickness=0)
 		self.radar_screen.pack(side=LEFT, anchor=NW, pady=5)
 
+		# Clicking on an aircraft on the radar screen locks on to it
+		self.radar_screen.bind("<1>", self.lock_clicked_aircraft)
+
 		# Create the container for smaller containers of buttons related to the radar display
 		self.button_container = Frame(self.main_container)
 		self.button_container.pack(side=LEFT, anchor=NW, padx=5, pady=5)
@@ -207,7 +249,7 @@ class GUI:
 		# Aircraft data summary screen #
 		################################
 
-		self.aircraft_summary_screen = Canvas(self.data_display_containter, width=480, height=350, bg='black', highlightthickness=0, scrollregion=(0,0,700,700))
+		self.aircraft_summary_screen = Canvas(self.data_display_containter, width=480, height=350, bg='black', highlightthickness=0, scrollregion=(0,0,800,700))
 		self.aircraft_summary_screen.grid(row=0, columnspan=3)
 
 		self.summary_x_scrollbar = Scrollbar(self.data_display_containter, orient=HORIZONTAL, command=self.aircraft_summary_screen.xview)
@@ -228,21 +270,29 @@ class GUI:
 		self.list_label = Label(self.aircraft_tracking_container1, text='LIST OPTIONS')
 
 		# Reset the aircraft list to be totally empty- helpful if the connection is broken and then old aircraft aren't being cleared
-		self.list_reset_button = Button(self.aircraft_tracking_container1, text='RESET LIST', command=self.tracker.clear_list)
+		self.list_reset_button = Button(self.aircraft_tracking_container1, text='RESET LIST', command=self.clear_list)
 
 		# Variables and checkbuttons that filter the aircraft list being displayed in the summary screen
 		self.list_var_position = IntVar()
 		self.list_var_flight = IntVar()
+		self.list_var_range = IntVar()
 
 		self.list_options_label = Label(self.aircraft_tracking_container1, text='\nONLY SHOW AIRCRAFT WITH:')
 		self.list_only_position = Checkbutton(self.aircraft_tracking_container1, text='VALID POSITION', variable=self.list_var_position)
 		self.list_only_flight = Checkbutton(self.aircraft_tracking_container1, text='FLIGHT NUMBER', variable=self.list_var_flight)
+		self.list_only_range = Checkbutton(self.aircraft_tracking_container1, text='RADAR RANGE', variable=self.list_var_range)
+
+		# Variable and checkbutton that sort the aircraft list by distance from the center point (closest first)
+		self.list_var_sort = IntVar()
+		self.list_sort_range = Checkbutton(self.aircraft_tracking_container1, text='SORT BY RANGE', variable=self.list_var_sort)
 		
 		self.list_label.grid(row=0, sticky=W)
 		self.list_reset_button.grid(row=1, sticky=W)
 		self.list_options_label.grid(row=2, sticky=W)
 		self.list_only_position.grid(row=3, sticky=W)
 		self.list_only_flight.grid(row=4, sticky=W)
+		self.list_only_range.grid(row=5, sticky=W)
+		self.list_sort_range.grid(row=6, sticky=W)
 
 		######################################
 		# Aircraft tracking/lock on controls #
@@ -301,7 +351,10 @@ class GUI:
 
 	def update_displays(self):
 
-		# Clear whatever is currently on the radar and aircraft summary screens
+		# Clear whatever is currently on the radar and aircraft summary screens.  Everything is redrawn instead
+		# of only the aircraft in the snapshot's Changeset: the poller can publish more than one snapshot between
+		# refreshes and a Changeset only covers one poll, and every aircraft's range and pixel position change
+		# whenever the range, unit, or center point does.
 		self.radar_screen.delete(ALL)
 		self.aircraft_summary_screen.delete(ALL)
 
@@ -324,22 +377,62 @@ class GUI:
 		# Update the list of aircraft being tracked if the conn_on button is selected
 		# and mark the conn_status_indicator label accordingly
 		if self.conn_status.get() == 1:
-			url = 'http://' + self.ip_address + ':8080/data.json'
-			self.tracker.get_flights(url)
+			urls = []
+			for ip_address in self.ip_address.split(','):
+				if len(ip_address.strip()) > 0:
+					urls.append('http://' + ip_address.strip() + ':8080/data.json')
+
+			# The SBS-1 stream is read from the first receiver only
+			if radar_config.SBS_STREAMING:
+				urls = self.ip_address.split(',')[0].strip() + ':' + str(radar_config.SBS_PORT)
+
+			# With background polling, this only starts the poller (or changes its URLs) and never waits for it
+			if self.poller is not None:
+				self.poller.start(urls)
+			else:
+				self.tracker.get_flights(urls)
+
 			self.conn_status_indicator.config(text='GOOD', bg='green')
 
+		elif self.poller is not None:
+			self.poller.stop()
+
+		# Pick up the latest state of the tracker
+		if self.poller is not None:
+			self.snapshot = self.poller.snapshot
+		else:
+			self.snapshot = make_snapshot(self.tracker, False)
+
 		# If the tracker encounters a connection error when get_flights() is called,
 		# select the conn_off button so that the program is not stuck in a loop trying
 		# to connect with the URL, then mark the conn_status_indicator label accordingly
-		if self.tracker.connection_error == True:
+		if self.snapshot.connection_error == True:
 			self.conn_off.select()
 			self.conn_status_indicator.config(text='ERROR', bg='red')
 
+			if self.poller is not None:
+				self.poller.stop()
+
+		# If the last poll failed for another reason (like a bad response), the poller keeps trying
+		# but the conn_status_indicator label shouldn't say everything is fine
+		elif self.snapshot.error is not None and self.conn_status.get() == 1:
+			self.conn_status_indicator.config(text='FAULT', bg='orange')
+
 		# If the conn_off button is selected but there wasn't a connection error
 		# mark the conn_status_label as unknown
-		if self.conn_status.get() == 0 and self.tracker.connection_error == False:
+		if self.conn_status.get() == 0 and self.snapshot.connection_error == False:
 			self.conn_status_indicator.config(text='UNKN', bg='yellow')
 
+		# Calculate the distance, bearing, and pixel coordinates of every aircraft at once, using the positions
+		# copied from the tracker's AircraftStore if it has one
+		if self.snapshot.positions is not None:
+			self.lats, self.lons, self.valid = self.snapshot.positions
+		else:
+			self.lats, self.lons, self.valid = vector_calculations.get_aircraft_positions(self.snapshot.aircraft_list)
+		self.ranges = vector_calculations.get_distances(self.current_lat, self.current_lon, self.lats, self.lons, self.unit_of_distance, self.valid)
+		self.bearings = vector_calculations.get_bearings(self.current_lat, self.current_lon, self.lats, self.lons, self.valid)
+		self.plot_x, self.plot_y = self.projection.to_pixels(self.lats, self.lons)
+
 		# Plot the currently tracked aircraft on the radar screen
 		self.plot_aircraft()
 
@@ -347,7 +440,7 @@ class GUI:
 		self.print_summary()
 
 		# Display the time when the tracker was last updated (position in top right corner)
-		self.radar_screen.create_text(595, 2, anchor=NE, fill='green', font=('Courier', 8), text=self.tracker.current_time)
+		self.radar_screen.create_text(595, 2, anchor=NE, fill='green', font=('Courier', 8), text=self.snapshot.current_time)
 
 		# Display the IP address currently used (position in top right corner)
 		self.radar_screen.create_text(595, 18, anchor=NE, fill='green', font=('Courier', 8), text='IP  ' + self.ip_address)
@@ -421,12 +514,8 @@ class GUI:
 
 	def update_scale(self):
 
-		self.lat_scale = calculations.get_scale(self.current_lat, self.current_lon, 'lat', self.range.get(), self.unit_of_distance)
-		self.lon_scale = calculations.get_scale(self.current_lat, self.current_lon, 'lon', self.range.get(), self.unit_of_distance)
-
-		# Divide by number of pixels from the center of the radar screen to the edge
-		self.lat_scale = round((self.lat_scale / 300), 6)
-		self.lon_scale = round((self.lon_scale / 300), 6)
+		# The edge of the radar screen is 300 pixels from the center at (300,300) and is the selected range away
+		self.projection = Projection(self.current_lat, self.current_lon, self.range.get(), self.unit_of_distance, 300, 300, 300)
 
 	def update_unit_of_distance(self):
 		if self.range_unit.get() == 1:
@@ -437,6 +526,13 @@ class GUI:
 
 		self.update_scale()  # Scale needs to be updated to factor in the new unit of distance
 
+	# Reset the aircraft list, through the poller if it's running the tracker on another thread
+	def clear_list(self):
+		if self.poller is not None:
+			self.poller.clear_list()
+		else:
+			self.tracker.clear_list()
+
 	# Update the ip_address when user presses Enter key after typing into the conn_ip_entry field
 	def update_ip_address(self, event):
 		if len(self.conn_ip_entry.get()) > 0:
@@ -479,15 +575,15 @@ class GUI:
 		if self.tracking3.get() == 1:
 			tracking_list.append(self.tracking_entry3.get().upper())
 
-		# Loop through each aircraft in the tracker object's aircraft list
-		for aircraft in self.tracker.aircraft_list:
+		# Loop through each aircraft in the snapshot of the tracker's aircraft list
+		for index, aircraft in enumerate(self.snapshot.aircraft_list):
 
 			if aircraft.validposition == 1:
 
-				# Adding 300 adjusts for the fact that the center of canvas is actually at pixel coordinates (300,300)
-				# whereas (0,0) is the top left corner of the canvas
-				plot_lat = round(((self.current_lat - aircraft.lat) / self.lat_scale), 0) + 300
-				plot_lon = round(((aircraft.lon - self.current_lon) / self.lon_scale), 0) + 300
+				# Pixel coordinates from the projection, where the center of the canvas is at (300,300)
+				# and (0,0) is the top left corner of the canvas
+				plot_lat = round(self.plot_y[index], 0)
+				plot_lon = round(self.plot_x[index], 0)
 
 				if plot_lat > 300:
 					n = -1
@@ -495,15 +591,12 @@ class GUI:
 					n = 1
 
 				# If the aircraft is in the tracking list (locked on), do a few extra things besides just plot its position:
-				# Calculate it's exact distance and bearing from the center point
 				# Draw a line from the center point to the aircraft
-				# Write its distance and bearing above its hex ID on the radar screen
+				# Write its distance and bearing from the center point above its hex ID on the radar screen
 				if aircraft.hex_code in tracking_list:
 					self.radar_screen.create_line(plot_lon, plot_lat, 300, 300, fill='red')
-					distance = calculations.get_distance(aircraft.lat, aircraft.lon, self.current_lat, self.current_lon, self.unit_of_distance)
-					distance = str(int(round(distance)))
-					bearing = calculations.get_bearing(self.current_lat, self.current_lon, aircraft.lat, aircraft.lon)
-					bearing = str(int(round(bearing)))
+					distance = str(int(round(self.ranges[index])))
+					bearing = str(int(round(self.bearings[index])))
 					self.radar_screen.create_text((plot_lon - 5), (plot_lat - (33*n)), anchor=W, fill='red', font=('Courier', 8), text=('DIST ' + distance))
 					self.radar_screen.create_text((plot_lon - 5), (plot_lat - (23*n)), anchor=W, fill='red', font=('Courier', 8), text=('BRG ' + bearing))
 					self.radar_screen.create_image(plot_lon, plot_lat, anchor=CENTER, image=self.red_square)
@@ -513,8 +606,36 @@ class GUI:
 					self.radar_screen.create_image(plot_lon, plot_lat, anchor=CENTER, image=self.green_square)
 					self.radar_screen.create_text((plot_lon - 5), (plot_lat - (13*n)), anchor=W, fill='green', font=('Courier', 8), text=aircraft.hex_code)
 	
+	# Lock on to the aircraft closest to where the radar screen was clicked, using the first tracking slot that isn't
+	# locked, or unlock it if it's already locked (nothing happens if no aircraft is within a few pixels of the click)
+	def lock_clicked_aircraft(self, event):
+
+		if self.lats is None:
+			return
+
+		index = self.projection.hit_test(event.x, event.y, self.lats, self.lons, self.valid)
+
+		if index is None:
+			return
+
+		hex_code = self.snapshot.aircraft_list[index].hex_code
+
+		slots = [(self.tracking1, self.tracking_entry1), (self.tracking2, self.tracking_entry2), (self.tracking3, self.tracking_entry3)]
+
+		for tracking, entry in slots:
+			if tracking.get() == 1 and entry.get().upper() == hex_code:
+				tracking.set(0)
+				return
+
+		for tracking, entry in slots:
+			if tracking.get() == 0:
+				entry.delete(0, END)
+				entry.insert(0, hex_code)
+				tracking.set(1)
+				return
+
 	# Helper function for print_summary(), returns true if aircraft meet all requirements to be printed
-	def do_list(self, aircraft):
+	def do_list(self, aircraft, distance):
 
 		# Assume aircraft meets requirements until marked False
 		status = True
@@ -524,18 +645,42 @@ class GUI:
 		if self.list_var_flight.get() == 1 and aircraft.flight == 'N/A':
 				status = False
 
+		# The distance is NaN for aircraft without a valid position, which are never within range
+		if self.list_var_range.get() == 1 and not distance <= self.range.get():
+				status = False
+
 		return status
 		
 	def print_summary(self):
 
-		self.aircraft_summary_screen.create_text(5, 5, anchor=NW, fill='green', font=('Courier', 8), text=self.tracker.summary_headings())
+		# Range and bearing columns are added in front of the columns from the tracker/aircraft summaries
+		headings = 'RNG'.ljust(5) + '  ' + 'BRG'.ljust(3) + '  ' + self.tracker.summary_headings()
+
+		self.aircraft_summary_screen.create_text(5, 5, anchor=NW, fill='green', font=('Courier', 8), text=headings)
 
-		self.aircraft_summary_screen.create_line(0, 22, 700, 22, fill='green', width=1)
+		self.aircraft_summary_screen.create_line(0, 22, 800, 22, fill='green', width=1)
+
+		# List the closest aircraft first if sorting by range (aircraft without a valid position go last)
+		if self.list_var_sort.get() == 1:
+			order = self.ranges.argsort(kind='mergesort')
+		else:
+			order = range(len(self.snapshot.aircraft_list))
 
 		y = 27
-		for aircraft in self.tracker.aircraft_list:
+		for index in order:
+			aircraft = self.snapshot.aircraft_list[index]
 
 			# Check to make sure the aircraft meets requirements to be listed if filter checkbuttons are selected
-			if self.do_list(aircraft) == True:
-				self.aircraft_summary_screen.create_text(5, y, anchor=NW, fill='green', font=('Courier', 8), text=aircraft.summary())
+			if self.do_list(aircraft, self.ranges[index]) == True:
+
+				if aircraft.validposition == 1:
+					distance = str(int(round(self.ranges[index])))
+					bearing = str(int(round(self.bearings[index])))
+				else:
+					distance = 'N/A'
+					bearing = 'N/A'
+
+				summary = (distance[:5]).ljust(5) + '  ' + (bearing[:3]).ljust(3) + '  ' + aircraft.summary()
+
+				self.aircraft_summary_screen.create_text(5, y, anchor=NW, fill='green', font=('Courier', 8), text=summary)
 				y += 15
\ No newline at end of file
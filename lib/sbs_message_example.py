@@ -0,0 +1,12 @@
+test_message = ("""MSG,8,1,1,A6B911,1,2017/06/10,18:01:01.921,2017/06/10,18:01:01.950,,,,,,,,,,,,0
+MSG,1,1,1,A6B911,1,2017/06/10,18:01:02.010,2017/06/10,18:01:02.040,NKS365  ,,,,,,,,,,,0
+MSG,3,1,1,A6B911,1,2017/06/10,18:01:02.120,2017/06/10,18:01:02.150,,9650,,,30.09192,-90.08261,,,0,0,0,0
+MSG,4,1,1,A6B911,1,2017/06/10,18:01:02.230,2017/06/10,18:01:02.260,,,267,326,,,2112,,0,0,0,0
+MSG,6,1,1,A6B911,1,2017/06/10,18:01:02.340,2017/06/10,18:01:02.370,,,,,,,,2576,0,0,0,0
+MSG,5,1,1,AC9AAE,1,2017/06/10,18:01:02.450,2017/06/10,18:01:02.480,,4600,,,,,,,0,,0,0
+MSG,3,1,1,A8996B,1,2017/06/10,18:01:02.560,2017/06/10,18:01:02.590,,12600,,,30.68658,-91.49969,,,0,0,0,0
+MSG,1,1,1,A8996B,1,2017/06/10,18:01:02.670,2017/06/10,18:01:02.700,UAL255  ,,,,,,,,,,,0
+MSG,4,1,1,A8996B,1,2017/06/10,18:01:02.780,2017/06/10,18:01:02.810,,,312,94,,,0,,0,0,0,0
+MSG,3,1,1,A6B911,1,2017/06/10,18:01:02.890,2017/06/10,18:01:02.920,,9725,,,30.09461,-90.08440,,,0,0,0,0
+MSG,7,1,1,A1B48C,1,2017/06/10,18:01:03.000,2017/06/10,18:01:03.030,,18675,,,,,,,,,,0
+""")
@@ -0,0 +1,128 @@
+import socket
+import threading
+import time
+import sys
+"""
+This module contains a small TCP server that replays recorded SBS-1 output to anything that
+connects to it, the same way dump1090 streams it on port 30003.  It can be used to run the
+StreamTracker without a receiver.
+
+To replay a capture file from the command line:
+python sbs_replay.py [capture file] [port] [lines per second]
+"""
+
+class ReplayServer:
+
+	def __init__(self, lines, port=0, lines_per_second=None):
+		"""
+		Constructor to create a new ReplayServer object.  The server doesn't accept connections until start() is called.
+
+		Parameters:
+			1 - list of SBS-1 lines to replay (without line endings)
+			2 - port to listen on (optional), the default of 0 picks any free port
+			3 - how fast to send the lines (optional), the default sends them all at once
+		"""
+
+		self.lines = lines
+		self.lines_per_second = lines_per_second
+
+		self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.server_socket.bind(('127.0.0.1', port))
+		self.server_socket.listen(5)
+
+		# Port actually being listened on (useful when any free port was picked)
+		self.port = self.server_socket.getsockname()[1]
+
+		# Set to stop sending once the current client has received everything, instead of closing the connection
+		self.hold_open = threading.Event()
+		self.hold_open.set()
+
+		self.running = False
+
+
+	def start(self):
+		"""
+		Starts accepting connections on a background thread.
+		"""
+
+		self.running = True
+
+		thread = threading.Thread(target=self.serve)
+		thread.daemon = True
+		thread.start()
+
+
+	def stop(self):
+		"""
+		Stops accepting connections.
+		"""
+
+		self.running = False
+		self.server_socket.close()
+
+
+	def serve(self):
+		"""
+		Accepts connections one at a time and replays every line to each of them.
+		"""
+
+		while self.running:
+			try:
+				client, address = self.server_socket.accept()
+			except socket.error:
+				break
+
+			try:
+				self.replay(client)
+			except socket.error:
+				pass
+
+			client.close()
+
+
+	def replay(self, client):
+		"""
+		Sends every line to one client, then keeps the connection open while hold_open is set.
+
+		Parameters:
+			1 - the client's socket
+		"""
+
+		if self.lines_per_second is None:
+			client.sendall(''.join([line + '\r\n' for line in self.lines]))
+
+		else:
+			for line in self.lines:
+				client.sendall(line + '\r\n')
+				time.sleep(1.0 / self.lines_per_second)
+
+		while self.running and self.hold_open.is_set():
+			time.sleep(0.1)
+
+
+if __name__ == '__main__':
+
+	capture_file = sys.argv[1]
+	port = 30003
+	lines_per_second = 50
+
+	if len(sys.argv) > 2:
+		port = int(sys.argv[2])
+
+	if len(sys.argv) > 3:
+		lines_per_second = float(sys.argv[3])
+
+	with open(capture_file) as f:
+		lines = [line.rstrip('\r\n') for line in f if len(line.strip()) > 0]
+
+	server = ReplayServer(lines, port, lines_per_second)
+	server.start()
+
+	print 'replaying ' + str(len(lines)) + ' lines on port ' + str(server.port) + ' (press Ctrl+C to stop)'
+
+	try:
+		while True:
+			time.sleep(1)
+	except KeyboardInterrupt:
+		server.stop()
@@ -0,0 +1,318 @@
+import socket
+import select
+import datetime
+import time
+from collections import OrderedDict
+from tracker import *
+"""
+This module contains classes for tracking aircraft from dump1090's streaming SBS-1 (BaseStation)
+output, which is sent as comma separated lines over a TCP socket (port 30003 by default).
+Unlike data.json, each line only carries some of an aircraft's info, so the latest value of every
+field is kept for each aircraft and each line is applied to the tracker as soon as it's read.
+
+Example line (transmission type 3 carries altitude and position):
+MSG,3,1,1,A6B911,1,2017/06/10,18:01:02.120,2017/06/10,18:01:02.150,,9650,,,30.09192,-90.08261,,,0,0,0,0
+"""
+
+# Position of each field in an SBS-1 line
+SBS_HEX = 4
+SBS_CALLSIGN = 10
+SBS_ALTITUDE = 11
+SBS_SPEED = 12
+SBS_TRACK = 13
+SBS_LAT = 14
+SBS_LON = 15
+SBS_SQUAWK = 17
+
+
+def parse_line(line):
+	"""
+	Parses one line of SBS-1 output.  Only MSG lines are used; fields left empty in the line
+	(because that transmission type doesn't carry them) are left out of the result.
+
+	Parameters:
+		1 - a line of SBS-1 output (without the line ending)
+
+	Returns:
+		Dictionary of the fields in the line using the same names as dump1090's data.json,
+		or None if the line isn't a usable MSG line
+	"""
+
+	fields = line.split(',')
+
+	if len(fields) < 18 or fields[0] != 'MSG' or len(fields[SBS_HEX]) == 0:
+		return None
+
+	update = {'hex': fields[SBS_HEX].strip().lower()}
+
+	try:
+		if len(fields[SBS_CALLSIGN].strip()) > 0:
+			update['flight'] = fields[SBS_CALLSIGN]
+
+		if len(fields[SBS_ALTITUDE]) > 0:
+			update['altitude'] = int(float(fields[SBS_ALTITUDE]))
+
+		if len(fields[SBS_SPEED]) > 0:
+			update['speed'] = int(round(float(fields[SBS_SPEED])))
+
+		if len(fields[SBS_TRACK]) > 0:
+			update['track'] = int(round(float(fields[SBS_TRACK])))
+			update['validtrack'] = 1
+
+		if len(fields[SBS_LAT]) > 0 and len(fields[SBS_LON]) > 0:
+			update['lat'] = float(fields[SBS_LAT])
+			update['lon'] = float(fields[SBS_LON])
+			update['validposition'] = 1
+
+		if len(fields[SBS_SQUAWK]) > 0:
+			update['squawk'] = fields[SBS_SQUAWK]
+
+	# Skip lines that were garbled in transmission
+	except ValueError:
+		return None
+
+	return update
+
+
+class SBSParser:
+
+	def __init__(self):
+		"""
+		Constructor to create a new SBSParser object, which turns chunks of data read from
+		the socket into parsed lines, holding on to any partial line until the rest arrives.
+		"""
+
+		self.buffer = ''
+
+
+	def feed(self, data):
+		"""
+		Adds newly received data and parses every line that is now complete.
+
+		Parameters:
+			1 - string of data read from the socket (can end in the middle of a line)
+
+		Returns:
+			List of dictionaries returned by parse_line(), in the order they were received
+		"""
+
+		self.buffer += data
+
+		# Everything after the last line ending is an incomplete line, so keep it for next time
+		end = self.buffer.rfind('\n')
+		if end == -1:
+			return []
+
+		lines = self.buffer[:end].split('\n')
+		self.buffer = self.buffer[end + 1:]
+
+		updates = []
+		for line in lines:
+			update = parse_line(line.rstrip('\r'))
+			if update is not None:
+				updates.append(update)
+
+		return updates
+
+
+class StreamTracker(Tracker):
+
+	def __init__(self, database, timeout=None, read_wait=0.1, max_read_time=0.25, max_read_bytes=1048576):
+		"""
+		Constructor to create a new StreamTracker object.
+
+		Parameters:
+			1 - FAA database file path (used when creating Aircraft objects)
+			2 - number of seconds to wait when connecting to the receiver (optional), default is to wait forever
+			3 - max number of seconds get_flights() waits for new data (optional)
+			4 - max number of seconds get_flights() spends reading before it returns (optional)
+			5 - max number of bytes get_flights() reads before it returns (optional)
+		"""
+
+		Tracker.__init__(self, database, timeout)
+
+		self.read_wait = read_wait
+		self.max_read_time = max_read_time
+		self.max_read_bytes = max_read_bytes
+
+		self.sock = None
+		self.address = None
+		self.parser = SBSParser()
+
+		# Latest value of every field for each aircraft, keyed by hex code, in the same format as
+		# a message from data.json so that it can be passed to the Tracker like any other message
+		self.messages = {}
+
+
+	def get_flights(self, address):
+		"""
+		Reads whatever SBS-1 lines have arrived since the last call and applies each of them to the tracked
+		aircraft as it's parsed.  Connects to the receiver first if there isn't a connection yet.
+		On a busy stream, reading stops after max_read_time seconds or max_read_bytes bytes so that
+		expiry and the rest of the poll still happen, and the rest of the data is read by the next call.
+
+		Parameters:
+			1 - the receiver's address in the format [IP address]:[port], for example 127.0.0.1:30003
+		"""
+
+		self.current_time = datetime.datetime.now().time()
+
+		self.reset_counters()
+
+		try:
+			if self.sock is None or address != self.address:
+				self.connect(address)
+
+			now = time.time()
+			deadline = now + self.max_read_time
+			bytes_read = 0
+
+			# Wait a little for the first data, then keep reading as long as more is ready
+			# (until the time or byte limit is reached)
+			wait = self.read_wait
+			while len(select.select([self.sock], [], [], wait)[0]) > 0:
+				data = self.sock.recv(65536)
+
+				# An empty read means the receiver closed the connection
+				if len(data) == 0:
+					raise socket.error('connection closed by receiver')
+
+				now = time.time()
+
+				# Merge every line in this chunk of data into its aircraft's message, so each aircraft
+				# is processed once with its latest fields (including seen)
+				messages = OrderedDict()
+				for update in self.parser.feed(data):
+					messages[update['hex']] = self.apply_update(update)
+
+				messages = messages.values()
+
+				# Look up every new aircraft in this chunk of data at once
+				aircraft_types = self.lookup_new_aircraft(messages)
+
+				for message in messages:
+					self.process_message(message, now, aircraft_types)
+
+				bytes_read += len(data)
+				if now >= deadline or bytes_read >= self.max_read_bytes:
+					break
+
+				wait = 0
+
+			self.connection_error = False
+
+		except (socket.error, socket.timeout):
+			self.connection_error = True
+			self.disconnect()
+
+		now = time.time()
+		self.update_seen(now)
+		self.finish_poll(now)
+
+
+	def connect(self, address):
+		"""
+		Opens the socket connection to the receiver, closing any existing connection.
+
+		Parameters:
+			1 - the receiver's address in the format [IP address]:[port]
+		"""
+
+		self.disconnect()
+
+		host, port = address.rsplit(':', 1)
+
+		self.address = address
+		self.sock = socket.create_connection((host, int(port)), self.timeout)
+
+
+	def disconnect(self):
+		"""
+		Closes the socket connection to the receiver if there is one.  Any partial line is thrown away.
+		"""
+
+		if self.sock is not None:
+			self.sock.close()
+
+		self.sock = None
+		self.parser = SBSParser()
+
+
+	def apply_update(self, update):
+		"""
+		Merges the fields from one parsed SBS-1 line into the latest message for that aircraft.
+
+		Parameters:
+			1 - dictionary returned by parse_line()
+
+		Returns:
+			The aircraft's merged message in data.json format
+		"""
+
+		hex_code = update['hex']
+		message = self.messages.get(hex_code)
+
+		if message is None:
+			message = {
+				'hex': hex_code, 'squawk': '', 'flight': '', 'lat': 0.0, 'lon': 0.0, 'validposition': 0,
+				'altitude': 0, 'track': 0, 'validtrack': 0, 'speed': 0, 'messages': 0, 'seen': 0
+			}
+			self.messages[hex_code] = message
+
+		message.update(update)
+		message['messages'] += 1
+		message['seen'] = 0
+
+		return message
+
+
+	def update_seen(self, now):
+		"""
+		SBS-1 lines don't have a "seen" field, so count the seconds since each aircraft's last line.
+		Aircraft whose seen value changes are recorded as updated.  An aircraft can send many lines
+		between calls, so the changeset is also cut down to list each updated aircraft once.
+
+		Parameters:
+			1 - the current wall clock time in seconds
+		"""
+
+		changed = set(self.changes.created)
+
+		updated = []
+		for hex_code in self.changes.updated:
+			if hex_code not in changed:
+				changed.add(hex_code)
+				updated.append(hex_code)
+
+		self.changes.updated[:] = updated
+
+		for hex_code, aircraft in self.aircraft_table.iteritems():
+			seen = int(now - self.last_seen_times[hex_code])
+
+			if seen != aircraft.seen:
+				aircraft.seen = seen
+				self.messages[hex_code.lower()]['seen'] = seen
+
+				if hex_code not in changed:
+					self.changes.updated.append(hex_code)
+
+
+	def remove_aircraft(self, hex_code):
+		"""
+		Stops tracking an aircraft and forgets its merged message.
+
+		Parameters:
+			1 - the hex code of the aircraft to remove
+		"""
+
+		Tracker.remove_aircraft(self, hex_code)
+		self.messages.pop(hex_code.lower(), None)
+
+
+	def clear_list(self):
+		"""
+		Makes the aircraft table empty and forgets every merged message.
+		"""
+
+		Tracker.clear_list(self)
+		self.messages.clear()
@@ -1,29 +1,85 @@
 import requests
 import json
 from aircraft import *
+import aircraft_lookup
+import enrichment
+from polling_client import *
 import transponder_message_example
 import datetime
+import time
+import heapq
+import itertools
+from collections import OrderedDict
+from collections import namedtuple
+
+# Hex codes of the aircraft that changed during one poll.  A hex code can be in both removed and created
+# if an aircraft was dropped for being over the seen_limit and started being tracked again in the same poll.
+Changeset = namedtuple('Changeset', ['created', 'updated', 'removed'])
 
 class Tracker:
 
-	def __init__(self, database):
+	def __init__(self, database, timeout=None):
 		"""
 		Constructor to create a new Tracker object.
-		Aircraft are created, updated, and tracked as Aircraft objects in a list.
+		Aircraft are created, updated, and tracked as Aircraft objects in a table keyed by hex code.
 
 		Parameters:
 			1 - FAA database file path (used when creating Aircraft objects)
+			2 - number of seconds to wait for the receiver before giving up (optional), default is to wait forever
 		"""
 
 		self.database = database
+		self.timeout = timeout
+
+		# Client that keeps a connection open to the receiver between polls
+		self.client = PollingClient(timeout)
 		self.seen_limit = 60  # Max limit for the "seen" element of a message before aircraft is removed from list
-		self.aircraft_list = []  # List that will hold Aircraft objects being tracked
+
+		# Table that will hold Aircraft objects being tracked, keyed by hex code so that an aircraft
+		# can be found, updated, or removed without looping through every other aircraft.
+		# An OrderedDict keeps the aircraft in the order they were first tracked.
+		self.aircraft_table = OrderedDict()
+
+		# Aircraft that stop appearing in the receiver's data are expired once this many seconds
+		# have passed since their last message, even if no new message ever arrives for them
+		self.expiry_limit = self.seen_limit
+
+		# Wall clock time of each tracked aircraft's last message, keyed by hex code
+		self.last_seen_times = {}
+
+		# Min-heap of (expiry time, sequence number, hex code, Aircraft) entries used to find stale aircraft
+		# without looping through the whole table.  Each tracked aircraft has one entry, which is pushed
+		# back with a later time when it's found at the top of the heap but has been seen again since.
+		# The sequence number breaks ties so that Aircraft objects are never compared.
+		self.expiry_heap = []
+		self.expiry_sequence = itertools.count()
 
 		# These are updated everytime get_flights() is called
 		self.number_updated = 0
 		self.number_created = 0
+		self.number_removed = 0
+		self.number_expired = 0
+		self.number_unchanged = 0
 		self.number_messages_received = 0
 
+		# Hex codes of the aircraft created, updated, and removed (including expired) by the last poll.
+		# The poller's snapshots and the AircraftStore use it to only copy what changed (the GUI still
+		# redraws everything, see GUI.update_displays())
+		self.changes = Changeset([], [], [])
+
+		# Optional AircraftStore that keeps the numeric fields of every aircraft in NumPy arrays,
+		# see enable_store()
+		self.store = None
+
+		# Optional Enricher that looks up aircraft types on worker threads, see enable_async_lookups()
+		self.enricher = None
+
+		# Hex codes of the aircraft that still have the placeholder type
+		self.pending_types = set()
+
+		# Running total of aircraft expired since the tracker was created
+		self.total_expired = 0
+
 		# Indicator if there was a connection error, can be used to display a waring in the GUI
 		self.connection_error = False
 
@@ -44,72 +100,358 @@ class Tracker:
 
 		self.current_time = datetime.datetime.now().time()
 
-		# Holding bin for JSON formatted results (transponder messages) returned from request.get()
-		# Intialized as an empty list so that the "if len(json_data) > 0" statement after the try/except block
-		# will still work even if there was a connection error 
+		# Holding bin for JSON formatted results (transponder messages) returned by the polling client
+		# Intialized as an empty list so that the messages can still be processed after the try/except block
+		# even if there was a connection error
 		json_data = []
 
 		try:
-			response = requests.get(url)
-			raw_text = response.text
-			json_data = json.loads(raw_text)
+			json_data = self.client.get_json(url)
 			self.connection_error = False
 
-		except requests.ConnectionError:
+		# An error status (like 404) means there's no data.json to poll at the URL, the same as not connecting
+		except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
 			self.connection_error = True
 
 		# Uncomment the statement below to load in sample data for testing purposes
 		# json_data = json.loads(transponder_message_example.test_message)
 
-		# Reset these to 0 each time this function is called
+		# If the receiver says nothing has changed since the last poll, there are no messages to process
+		# but aircraft that haven't been seen for too long still need to be expired
+		if json_data is None:
+			self.reset_counters()
+			self.finish_poll(time.time())
+
+		else:
+			self.process_messages(json_data)
+
+
+	def process_messages(self, json_data):
+		"""
+		Checks if each message belongs to an aircraft that is currently being "tracked" in the aircraft table.
+		If not, it creates a new Aircraft object and adds it to the table.
+		If the airtcraft is already in the table, its instance variables are updated with info from the new message.
+		Each message costs one hash lookup no matter how many aircraft are being tracked.
+		Messages that are identical to the aircraft's last message (same messages counter and same seen)
+		are skipped without updating anything.
+
+		Parameters:
+			1 - list of messages received from Mode S transponders in JSON format
+		"""
+
+		self.reset_counters()
+
+		self.number_messages_received = len(json_data)
+
+		now = time.time()
+
+		aircraft_types = self.lookup_new_aircraft(json_data)
+
+		for message in json_data:
+			self.process_message(message, now, aircraft_types)
+
+		self.finish_poll(now)
+
+
+	def lookup_new_aircraft(self, json_data):
+		"""
+		Looks up the types of every aircraft in a list of messages that isn't being tracked yet,
+		all at once, so that a poll with hundreds of new aircraft (like the first poll after the
+		list is reset) doesn't need hundreds of separate database lookups.
+
+		Parameters:
+			1 - list of messages received from Mode S transponders in JSON format
+
+		Returns:
+			Dictionary of aircraft types keyed by hex code
+		"""
+
+		hex_codes = set()
+
+		for message in json_data:
+			hex_code = str(message.get('hex')).upper()
+
+			if hex_code not in self.aircraft_table and message.get('seen') <= self.seen_limit:
+				hex_codes.add(hex_code)
+
+		if len(hex_codes) == 0:
+			return {}
+
+		# With async lookups, only cached types are used right away and the rest get the placeholder
+		# while the enricher looks them up
+		if self.enricher is not None:
+			aircraft_types = {}
+			pending = []
+
+			for hex_code in hex_codes:
+				aircraft_type = aircraft_lookup.type_cache.get((self.database, hex_code))
+
+				if aircraft_type is None:
+					aircraft_type = enrichment.PENDING_TYPE
+					pending.append(hex_code)
+
+				aircraft_types[hex_code] = aircraft_type
+
+			self.enricher.request(pending)
+			self.pending_types.update(pending)
+
+			return aircraft_types
+
+		return aircraft_lookup.get_aircraft_types(self.database, hex_codes)
+
+
+	def process_message(self, message, now, aircraft_types=None):
+		"""
+		Creates, updates, or removes the aircraft that a single message belongs to.
+
+		Parameters:
+			1 - message received from a Mode S transponder in JSON format
+			2 - the current wall clock time in seconds
+			3 - dictionary of aircraft types already looked up, keyed by hex code (optional),
+			    aircraft that aren't in it are looked up one at a time when they are created
+		"""
+
+		hex_code = str(message.get('hex')).upper()
+		in_list = False
+
+		# Check if hex code belongs to an aircraft that is already in the table
+		aircraft = self.aircraft_table.get(hex_code)
+
+		# If the aircraft is in the table...
+		if aircraft is not None:
+
+			# Check if its last message is over the seen_limit
+			# and if so, remove the aircraft from the table
+			if aircraft.seen > self.seen_limit:
+				self.remove_aircraft(hex_code)
+				self.changes.removed.append(hex_code)
+				self.number_removed += 1
+
+			# If the receiver hasn't heard anything new from the aircraft since the last poll
+			# there is nothing to update
+			elif message.get('messages') == aircraft.messages and message.get('seen') == aircraft.seen:
+				in_list = True
+				self.number_unchanged += 1
+
+			# Otherwise, update its info based on the current message
+			else:
+				aircraft.update_info(message)
+				self.last_seen_times[hex_code] = now - aircraft.seen
+				self.changes.updated.append(hex_code)
+				in_list = True
+				self.number_updated += 1
+
+		# If it's not in the table, create a new Aircraft object and add it to the table
+		# but only if its last message isn't over the seen_limit
+		if not in_list and message.get('seen') <= self.seen_limit:
+			aircraft_type = None
+			if aircraft_types is not None:
+				aircraft_type = aircraft_types.get(hex_code)
+
+			self.add_aircraft(Aircraft(message, self.database, aircraft_type), now)
+			self.changes.created.append(hex_code)
+			self.number_created += 1
+
+
+	def finish_poll(self, now):
+		"""
+		Does the work that has to happen at the end of every poll: expires stale aircraft
+		and brings the columnar store (if there is one) up to date with this poll's changes.
+
+		Parameters:
+			1 - the current wall clock time in seconds
+		"""
+
+		self.sweep_expired(now)
+
+		if self.enricher is not None:
+			self.apply_lookup_results()
+
+		if self.store is not None:
+			self.store.apply_changes(self.changes, self.aircraft_table)
+
+
+	def enable_async_lookups(self, workers=2):
+		"""
+		Starts looking up the types of new aircraft on worker threads instead of while processing messages.
+		New aircraft are tracked right away with a placeholder type (unless their type is already cached),
+		and the real type is filled in at the end of the first poll after it's found.
+
+		Parameters:
+			1 - number of worker threads (optional)
+
+		Returns:
+			The Enricher
+		"""
+
+		self.enricher = enrichment.Enricher(self.database, workers)
+
+		return self.enricher
+
+
+	def apply_lookup_results(self):
+		"""
+		Fills in the types that the enricher has found for aircraft that still have the placeholder type.
+		Those aircraft are recorded as updated in this poll's changeset.  Aircraft that are still waiting
+		for their type are requested again, so that one whose lookup failed is retried on the next poll
+		(requests that are still being looked up are skipped by the enricher).
+		"""
+
+		results = self.enricher.get_results()
+
+		if len(results) > 0:
+			changed = set(self.changes.created)
+			changed.update(self.changes.updated)
+
+			for hex_code, aircraft_type in results.iteritems():
+				self.pending_types.discard(hex_code)
+				aircraft = self.aircraft_table.get(hex_code)
+
+				if aircraft is not None and aircraft.aircraft_type == enrichment.PENDING_TYPE:
+					aircraft.aircraft_type = intern(str(aircraft_type))
+
+					if hex_code not in changed:
+						self.changes.updated.append(hex_code)
+
+		if len(self.pending_types) > 0:
+
+			# Forget the aircraft that aren't being tracked anymore
+			self.pending_types.intersection_update(self.aircraft_table)
+
+			self.enricher.request(self.pending_types)
+
+
+	def enable_store(self, capacity=256):
+		"""
+		Starts keeping the numeric fields of every tracked aircraft in an AircraftStore (NumPy arrays)
+		so that whole-fleet calculations can be vectorized.  The Aircraft objects are still tracked as usual.
+		NumPy is only needed if this is called.
+
+		Parameters:
+			1 - number of rows to allocate to start with (optional)
+
+		Returns:
+			The AircraftStore
+		"""
+
+		import aircraft_store
+
+		self.store = aircraft_store.AircraftStore(capacity)
+
+		for aircraft in self.aircraft_table.itervalues():
+			self.store.update(aircraft)
+
+		return self.store
+
+
+	def reset_counters(self):
+		"""
+		Resets the counters and changeset that describe a single poll.
+		"""
+
 		self.number_updated = 0
 		self.number_created = 0
 		self.number_removed = 0
+		self.number_unchanged = 0
+		self.number_messages_received = 0
 
-		self.number_messages_received = len(json_data)
-		
-		# If request actually returns results
-		if len(json_data) > 0:
-			
-			for message in json_data:
-				hex_code = str(message.get('hex')).upper()
-				in_list = False
-
-				# Check if hex code belongs to an aircraft that is already in the list
-				# by looping through each aircraft
-				for aircraft in self.aircraft_list:
-
-					# If the if the aircraft is in the list...
-					if hex_code == aircraft.hex_code:
-
-						# Check if its last message is over the seen_limit
-						# and if so, remove the aircraft from the list
-						if aircraft.seen > self.seen_limit:
-							self.aircraft_list.remove(aircraft)
-							self.number_removed += 1
-							break
-
-						# Otherwise, update its info based on the current message
-						else:
-							aircraft.update_info(message)
-							in_list = True
-							self.number_updated += 1
-							break
-
-				# If it's not in the list, create a new Aircraft object and append it to the list
-				# but only if its last message isn't over the seen_limit
-				if not in_list and message.get('seen') <= self.seen_limit:
-					self.aircraft_list.append(Aircraft(message, self.database))
-					self.number_created += 1
+		self.changes = Changeset([], [], [])
+
+
+	def add_aircraft(self, aircraft, now):
+		"""
+		Adds an Aircraft object to the table and schedules it for expiry.
+
+		Parameters:
+			1 - the Aircraft object to start tracking
+			2 - the current wall clock time in seconds
+		"""
+
+		last_seen_time = now - aircraft.seen
+
+		self.aircraft_table[aircraft.hex_code] = aircraft
+		self.last_seen_times[aircraft.hex_code] = last_seen_time
+
+		heapq.heappush(self.expiry_heap, (last_seen_time + self.expiry_limit, next(self.expiry_sequence), aircraft.hex_code, aircraft))
+
+
+	def remove_aircraft(self, hex_code):
+		"""
+		Stops tracking an aircraft.  Its entry in the expiry heap is left behind and is
+		thrown away when it reaches the top of the heap.
+
+		Parameters:
+			1 - the hex code of the aircraft to remove
+		"""
+
+		del self.aircraft_table[hex_code]
+		del self.last_seen_times[hex_code]
+
+
+	def sweep_expired(self, now=None):
+		"""
+		Removes every aircraft that hasn't been seen for longer than the expiry_limit.
+		Only heap entries whose expiry time has passed are looked at, so the cost of each sweep
+		is proportional to the number of aircraft that expired (plus the ones rescheduled), not
+		the number of aircraft being tracked.
+
+		Parameters:
+			1 - the current wall clock time in seconds (optional), defaults to time.time()
+
+		Returns:
+			The number of aircraft that were expired
+		"""
+
+		if now is None:
+			now = time.time()
+
+		self.number_expired = 0
+
+		while len(self.expiry_heap) > 0 and self.expiry_heap[0][0] <= now:
+			expiry_time, sequence, hex_code, aircraft = heapq.heappop(self.expiry_heap)
+
+			# Skip entries left behind by aircraft that were already removed or replaced
+			if self.aircraft_table.get(hex_code) is not aircraft:
+				continue
+
+			# If the aircraft has been seen since this entry was pushed, push it back with its new expiry time
+			expiry_time = self.last_seen_times[hex_code] + self.expiry_limit
+
+			if expiry_time > now:
+				heapq.heappush(self.expiry_heap, (expiry_time, next(self.expiry_sequence), hex_code, aircraft))
+
+			else:
+				self.remove_aircraft(hex_code)
+				self.changes.removed.append(hex_code)
+				self.number_expired += 1
+
+		self.total_expired += self.number_expired
+
+		return self.number_expired
+
+
+	@property
+	def aircraft_list(self):
+		"""
+		Returns a list of the Aircraft objects being tracked, in the order they were first tracked.
+		The list is a copy, so it's safe to loop through it even if the table changes.
+		"""
+		return self.aircraft_table.values()
 
 
 	def clear_list(self):
 		"""
-		Makes the aircraft_list empty.  
+		Makes the aircraft table empty.  
 		May be useful if the list needs to be reset from the GUI in the event that
 		the connection is broken.
 		"""
-		self.aircraft_list = []
+		self.aircraft_table.clear()
+		self.last_seen_times.clear()
+		self.expiry_heap = []
+		self.pending_types.clear()
+
+		if self.store is not None:
+			self.store.clear()
 
 
 	def summary_headings(self):
@@ -0,0 +1,40 @@
+import os
+import time
+import benchmark_data
+from tracker import *
+"""
+Times how long Tracker.process_messages() takes for a single poll as the number of
+tracked aircraft grows.  Run from the lib directory: python tracker_benchmark.py
+"""
+
+polls = 20
+
+database = benchmark_data.make_database()
+
+print 'fleet size   create poll (ms)   update poll (ms)   per aircraft (us)'
+
+for fleet_size in [50, 100, 250, 500, 1000, 2000]:
+
+	tracker = Tracker(database)
+
+	# The first poll creates every aircraft (includes one database lookup per aircraft)
+	start = time.time()
+	tracker.process_messages(benchmark_data.make_messages(fleet_size))
+	create_time = time.time() - start
+
+	# Build the messages ahead of time so only the tracker's work is timed
+	poll_messages = [benchmark_data.make_messages(fleet_size, poll) for poll in range(1, polls + 1)]
+
+	start = time.time()
+	for messages in poll_messages:
+		tracker.process_messages(messages)
+	update_time = (time.time() - start) / polls
+
+	print (
+		str(fleet_size).ljust(10) + '   ' +
+		('%.2f' % (create_time * 1000)).ljust(16) + '   ' +
+		('%.3f' % (update_time * 1000)).ljust(16) + '   ' +
+		('%.3f' % (update_time * 1000000 / fleet_size))
+	)
+
+os.remove(database)
@@ -0,0 +1,152 @@
+import numpy
+"""
+This module contains NumPy versions of the distance and bearing calculations in the calculations
+module, which work on arrays of latitudes and longitudes so that the distance and bearing from the
+center point to every tracked aircraft can be found with one call instead of one call per aircraft.
+The formulas are the same ones used by calculations.get_distance() and calculations.get_bearing().
+"""
+
+def get_earth_radius(unit='miles'):
+	"""
+	Returns Earth's radius in the same units calculations.get_distance() uses.
+
+	Parameters:
+		1 - unit of distance (optional), "miles" or "km", default is miles
+	"""
+
+	if unit == 'miles':
+		return 3959  # radius in miles
+
+	elif unit == 'km':
+		return 6371  # radius in kilometers
+
+	else:
+		raise ValueError('unknown units: ' + str(unit))
+
+
+def get_distances(lat1, lon1, lats, lons, unit='miles', valid=None):
+	"""
+	Calculate the distance from one point to many points on Earth using the haversine formula.
+
+	Parameters:
+		1 - latitude of the starting point in decimal degrees
+		2 - longitude of the starting point in decimal degrees
+		3 - array of latitudes in decimal degrees
+		4 - array of longitudes in decimal degrees
+		5 - unit of distance (optional), "miles" or "km", default is miles
+		6 - boolean array that is False for positions that aren't valid (optional)
+
+	Returns:
+		Array of distances, with NaN for the positions that aren't valid
+	"""
+
+	lats = numpy.radians(numpy.asarray(lats, dtype=float))
+	lons = numpy.radians(numpy.asarray(lons, dtype=float))
+
+	lat1 = numpy.radians(lat1)
+	lon1 = numpy.radians(lon1)
+
+	a = numpy.sin((lats - lat1) / 2)**2 + numpy.cos(lat1) * numpy.cos(lats) * numpy.sin((lons - lon1) / 2)**2
+
+	distances = get_earth_radius(unit) * 2 * numpy.arctan2(numpy.sqrt(a), numpy.sqrt(1 - a))
+
+	if valid is not None:
+		distances[~numpy.asarray(valid, dtype=bool)] = numpy.nan
+
+	return distances
+
+
+def get_bearings(lat1, lon1, lats, lons, valid=None):
+	"""
+	Calculate the bearing of many points relative to one point.
+
+	Parameters:
+		1 - latitude of the starting point in decimal degrees
+		2 - longitude of the starting point in decimal degrees
+		3 - array of latitudes in decimal degrees
+		4 - array of longitudes in decimal degrees
+		5 - boolean array that is False for positions that aren't valid (optional)
+
+	Returns:
+		Array of bearings in degrees (0 to 360), with NaN for the positions that aren't valid
+	"""
+
+	lats = numpy.radians(numpy.asarray(lats, dtype=float))
+	dif_lons = numpy.radians(numpy.asarray(lons, dtype=float) - lon1)
+
+	lat1 = numpy.radians(lat1)
+
+	x = numpy.cos(lats) * numpy.sin(dif_lons)
+	y = numpy.cos(lat1) * numpy.sin(lats) - numpy.sin(lat1) * numpy.cos(lats) * numpy.cos(dif_lons)
+
+	bearings = (numpy.degrees(numpy.arctan2(x, y)) + 360) % 360
+
+	if valid is not None:
+		bearings[~numpy.asarray(valid, dtype=bool)] = numpy.nan
+
+	return bearings
+
+
+def get_store_ranges(store, lat1, lon1, unit='miles', hex_codes=None):
+	"""
+	Calculate the distance and bearing from a point to the aircraft in an AircraftStore.
+
+	Parameters:
+		1 - AircraftStore
+		2 - latitude of the starting point in decimal degrees
+		3 - longitude of the starting point in decimal degrees
+		4 - unit of distance (optional), "miles" or "km", default is miles
+		5 - list of hex codes (optional), default is every row of the store
+
+	Returns:
+		Arrays of distances and bearings in the same order as the hex codes (or the store's rows,
+		see store.hex_codes), with NaN for the aircraft that don't have a valid position
+	"""
+
+	if hex_codes is None:
+		lats, lons, valid = store.lat, store.lon, store.position_mask()
+	else:
+		lats, lons, valid = store.get_positions(hex_codes)
+
+	return get_distances(lat1, lon1, lats, lons, unit, valid), get_bearings(lat1, lon1, lats, lons, valid)
+
+
+def get_aircraft_positions(aircraft_list):
+	"""
+	Collects the positions of a list of Aircraft objects into arrays.
+
+	Parameters:
+		1 - list of Aircraft
+
+	Returns:
+		Arrays of latitudes, longitudes, and whether each aircraft has a valid position,
+		in the same order as the list
+	"""
+
+	count = len(aircraft_list)
+
+	lats = numpy.fromiter((aircraft.lat for aircraft in aircraft_list), dtype=float, count=count)
+	lons = numpy.fromiter((aircraft.lon for aircraft in aircraft_list), dtype=float, count=count)
+	valid = numpy.fromiter((aircraft.validposition == 1 for aircraft in aircraft_list), dtype=bool, count=count)
+
+	return lats, lons, valid
+
+
+def get_aircraft_ranges(aircraft_list, lat1, lon1, unit='miles'):
+	"""
+	Calculate the distance and bearing from a point to every aircraft in a list of Aircraft objects.
+
+	Parameters:
+		1 - list of Aircraft
+		2 - latitude of the starting point in decimal degrees
+		3 - longitude of the starting point in decimal degrees
+		4 - unit of distance (optional), "miles" or "km", default is miles
+
+	Returns:
+		Arrays of distances and bearings in the same order as the list, with NaN for the
+		aircraft that don't have a valid position
+	"""
+
+	lats, lons, valid = get_aircraft_positions(aircraft_list)
+
+	return get_distances(lat1, lon1, lats, lons, unit, valid), get_bearings(lat1, lon1, lats, lons, valid)
@@ -3,12 +3,36 @@ This file contains the default values for several variables used by
 the GUI module and others.
 """
 
+# Can also be a binary index file created by db/faa_index_export.py
 DATABASE = 'db/faa_database.db'
 
 DEFAULT_LAT = 30.033706
 
 DEFAULT_LON = -90.053415
 
+# Separate IP addresses with commas to track aircraft from more than one receiver
 DEFAULT_IP = '127.0.0.1'
 
-DEFAULT_UNIT_OF_DISTANCE = 'miles'
\ No newline at end of file
+DEFAULT_UNIT_OF_DISTANCE = 'miles'
+
+# Run the tracker on a background thread so that slow requests or database lookups don't freeze the GUI
+BACKGROUND_POLLING = True
+
+# Number of seconds between each time the tracker polls the receiver
+POLL_INTERVAL = 0.5
+
+# Number of seconds to wait for the receiver to respond before marking the connection as an error
+REQUEST_TIMEOUT = 2
+
+# Read aircraft from the receiver's streaming SBS-1 (BaseStation) output instead of polling data.json
+SBS_STREAMING = False
+
+# Port that dump1090 sends SBS-1 output on
+SBS_PORT = 30003
+
+# Look up the types of new aircraft on worker threads (they are shown as PENDING until found)
+ASYNC_LOOKUPS = True
+
+# Keep the positions of the tracked aircraft in NumPy arrays (an AircraftStore) for the range, bearing,
+# and radar screen calculations
+AIRCRAFT_STORE = True
\ No newline at end of file